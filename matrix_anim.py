@@ -0,0 +1,176 @@
+"""Pre-rendered animation files, played back through mmap.
+
+A finite pattern is rendered once, remapped to LED order, and written as:
+
+    64-byte header   magic 'WYPA', version, flags, width, height, LED count,
+                     frame count, fps, 32-byte parameter key, index offset
+    frame data       raw: frames x LEDs x 3 bytes, back to back
+                     delta: per frame, a uint32 change count, the changed
+                     LED indices (uint32) and their RGB bytes
+    frame index      (delta only) uint64 offset of every frame record
+
+Raw frames are sliced straight out of the memory map, so playback hands the
+backend a view of the file with no decoding or copying. The key hashes the
+pattern, its parameters (with the size and modification time of any file
+they name) and the geometry; a mismatch means re-render.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import numpy as np
+from matrix_clock import FrameClock
+from matrix_engine import Canvas, frames
+
+MAGIC = b'WYPA'
+VERSION = 1
+FLAG_DELTA = 1
+HEADER = struct.Struct('<4sHHHHIIf32sQ')
+
+DEFAULT_CACHE_DIR = os.path.expanduser('~/.cache/wyp-pi')
+
+def animation_key(spec, mapping, fps, params):
+    """Hash of everything that changes the rendered frames"""
+    params = {**spec.defaults, **params}
+    # Files named in the parameters (fonts, say) count by size and modification time
+    files = {}
+    for name, value in params.items():
+        if isinstance(value, str) and os.path.isfile(value):
+            stat = os.stat(value)
+            files[name] = [stat.st_size, stat.st_mtime_ns]
+    description = json.dumps({
+        'pattern': f"{spec.func.__module__}.{spec.func.__qualname__}",
+        'params': params,
+        'files': files,
+        'fps': fps,
+    }, sort_keys=True, default=repr).encode()
+    digest = hashlib.sha256(description)
+    digest.update(mapping.index_map.tobytes())
+    return digest.digest()
+
+def render_animation(spec, mapping, path, fps=None, delta=False, limit=10000, **params):
+    """Render a finite pattern to an animation file, returning its path"""
+    fps = fps or spec.fps
+    key = animation_key(spec, mapping, fps, params)
+    leds = np.empty((mapping.count, 3), dtype=np.uint8)
+    previous = np.zeros_like(leds)
+    offsets = []
+    count = 0
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(bytes(HEADER.size))
+        for frame in frames(spec, Canvas(mapping), fps, **params):
+            mapping.to_leds(frame, out=leds)
+            if delta:
+                offsets.append(f.tell())
+                changed = np.flatnonzero(np.any(leds != previous, axis=1)).astype('<u4')
+                f.write(struct.pack('<I', len(changed)))
+                f.write(changed.tobytes())
+                f.write(leds[changed].tobytes())
+                np.copyto(previous, leds)
+            else:
+                f.write(leds.tobytes())
+            count += 1
+            if count >= limit:
+                break
+        index_offset = 0
+        if delta:
+            index_offset = f.tell()
+            f.write(np.array(offsets, dtype='<u8').tobytes())
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, FLAG_DELTA if delta else 0, mapping.width,
+                            mapping.height, mapping.count, count, fps, key, index_offset))
+    os.replace(tmp, path)
+    return path
+
+class Animation:
+    """A memory-mapped animation file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, flags, self.width, self.height, self.count, self.frame_count,
+         self.fps, self.key, index_offset) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a version {VERSION} animation file")
+        self.delta = bool(flags & FLAG_DELTA)
+        data = np.frombuffer(self._mmap, dtype=np.uint8)
+        if self.delta:
+            self.offsets = data[index_offset:index_offset + 8 * self.frame_count].view('<u8')
+            self._data = data
+            self._work = np.zeros((self.count, 3), dtype=np.uint8)
+            self._next = 0
+        else:
+            # Zero-copy (frames, LEDs, 3) view of the file
+            self.frames = data[HEADER.size:HEADER.size + self.frame_count * self.count * 3] \
+                .reshape(self.frame_count, self.count, 3)
+
+    def __len__(self):
+        return self.frame_count
+
+    def frame(self, index):
+        """LED-ordered RGB data for one frame (a view; don't keep it across calls)"""
+        if not self.delta:
+            return self.frames[index]
+        if index < self._next:
+            # Deltas only run forwards: replay from the start
+            self._work[:] = 0
+            self._next = 0
+        while self._next <= index:
+            offset = int(self.offsets[self._next])
+            changed = int(self._data[offset:offset + 4].view('<u4')[0])
+            indices = self._data[offset + 4:offset + 4 + 4 * changed].view('<u4')
+            values = self._data[offset + 4 + 4 * changed:offset + 4 + 7 * changed].reshape(-1, 3)
+            self._work[indices] = values
+            self._next += 1
+        return self._work
+
+    def close(self):
+        self.frames = None
+        self.offsets = None
+        self._data = None
+        self._mmap.close()
+
+def cached_animation(spec, mapping, cache_dir=DEFAULT_CACHE_DIR, fps=None, delta=False,
+                     limit=10000, **params):
+    """Open a pattern's cached animation, rendering it first if missing or stale"""
+    fps = fps or spec.fps
+    key = animation_key(spec, mapping, fps, params)
+    os.makedirs(cache_dir, exist_ok=True)
+    suffix = '-delta' if delta else ''
+    path = os.path.join(cache_dir, f"{spec.name}-{key.hex()[:16]}{suffix}.wypa")
+    if os.path.exists(path):
+        try:
+            animation = Animation(path)
+            if animation.key == key and animation.delta == delta:
+                return animation
+            animation.close()
+        except (ValueError, struct.error):
+            pass
+    render_animation(spec, mapping, path, fps, delta, limit, **params)
+    return Animation(path)
+
+def play(matrix, animation, loops=1, clock=None):
+    """Play an animation on a matrix at its recorded frame rate
+
+    loops=None repeats forever. Returns the frame clock.
+    """
+    if not len(animation):
+        # Looping would spin without ever showing anything
+        raise ValueError(f"{animation.path}: animation has no frames")
+    clock = clock or FrameClock(animation.fps)
+    clock.start()
+    loop = 0
+    while loops is None or loop < loops:
+        for index in range(len(animation)):
+            leds = animation.frame(index)
+            if clock.should_drop():
+                continue
+            matrix.show_leds(leds)
+            clock.wait()
+        loop += 1
+    return clock
@@ -0,0 +1,225 @@
+"""Audio-reactive spectrum and VU meter patterns.
+
+A capture thread reads 16-bit PCM in small fixed-size blocks from a WAV
+file, a pipe or an ALSA device (through arecord) and downmixes each block
+into a preallocated ring of blocks. The render loop never waits on audio:
+each frame it copies out the newest samples, runs a Hann-windowed FFT and
+folds it into logarithmically spaced bands, one per matrix column, with
+decay and peak hold. With the default 512-sample blocks at 44.1 kHz a
+sound reaches the LEDs within about 12 ms plus one frame.
+"""
+import subprocess
+import sys
+import threading
+import time
+import wave
+import numpy as np
+from matrix_color import make_palette
+
+DEFAULT_RATE = 44100
+BLOCK = 512
+# Level meters run from this many dB below full scale up to 0 dB
+FLOOR_DB = -60.0
+# Bottom to top of a bar
+BAR_PALETTE = make_palette([(0, 255, 0), (255, 255, 0), (255, 0, 0)], [0, 170, 255])
+
+def open_source(source, rate=DEFAULT_RATE, channels=1):
+    """Open an audio source as (binary stream, rate, channels, realtime, process).
+
+    source is a .wav path, '-' for raw signed 16-bit PCM on stdin, 'alsa'
+    for the default capture device or 'alsa:DEVICE' for another one.
+    realtime is False for files, which are then paced to the wall clock.
+    """
+    if source == '-':
+        return sys.stdin.buffer, rate, channels, True, None
+    if source == 'alsa' or source.startswith('alsa:'):
+        device = source[5:] or 'default'
+        process = subprocess.Popen(['arecord', '-q', '-D', device, '-t', 'raw', '-f', 'S16_LE',
+                                    '-r', str(rate), '-c', str(channels)],
+                                   stdout=subprocess.PIPE, bufsize=0)
+        return process.stdout, rate, channels, True, process
+    wav = wave.open(source, 'rb')
+    if wav.getsampwidth() != 2:
+        wav.close()
+        raise ValueError(f"{source}: only 16-bit WAV files are supported")
+    return wav, wav.getframerate(), wav.getnchannels(), False, None
+
+class AudioCapture:
+    """Reads PCM blocks from a source in a background thread into a ring buffer"""
+
+    def __init__(self, source, rate=DEFAULT_RATE, channels=1, block=BLOCK, slots=32):
+        self.stream, self.rate, self.channels, realtime, self._process = \
+            open_source(source, rate, channels)
+        self.block = block
+        self.slots = slots
+        # Mono samples in -1.0..1.0, one row per block
+        self._ring = np.zeros((slots, block), dtype=np.float32)
+        self.blocks = 0
+        self.finished = False
+        self._pace = not realtime
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='audio', daemon=True)
+        self._thread.start()
+
+    def _read_block(self, buffer):
+        """Fill buffer completely; returns False at the end of the stream"""
+        view = memoryview(buffer)
+        filled = 0
+        while filled < len(buffer):
+            if isinstance(self.stream, wave.Wave_read):
+                data = self.stream.readframes((len(buffer) - filled) // (2 * self.channels))
+                count = len(data)
+                view[filled:filled + count] = data
+            else:
+                count = self.stream.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
+
+    def _run(self):
+        buffer = bytearray(self.block * self.channels * 2)
+        samples = np.frombuffer(buffer, dtype=np.int16).reshape(self.block, self.channels)
+        mono = np.empty(self.block, dtype=np.float32)
+        scale = np.float32(1.0 / (32768 * self.channels))
+        period = self.block / self.rate
+        deadline = time.monotonic()
+        try:
+            while not self._stop.is_set() and self._read_block(buffer):
+                np.add.reduce(samples, axis=1, dtype=np.float32, out=mono)
+                mono *= scale
+                with self._lock:
+                    self._ring[self.blocks % self.slots] = mono
+                    self.blocks += 1
+                if self._pace:
+                    # Files are read as fast as the disk allows; play them at their own rate
+                    deadline += period
+                    delay = deadline - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+        except (OSError, ValueError) as e:
+            if not self._stop.is_set():
+                print(f"Audio capture stopped: {e}", file=sys.stderr)
+        finally:
+            self.finished = True
+
+    def latest(self, out):
+        """Copy the newest len(out) samples (a multiple of block) into out, oldest first"""
+        count = len(out) // self.block
+        with self._lock:
+            newest = self.blocks
+            for i in range(count):
+                slot = (newest - count + i) % self.slots
+                out[i * self.block:(i + 1) * self.block] = self._ring[slot]
+        return newest
+
+    def close(self):
+        self._stop.set()
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+        self._thread.join(timeout=1.0)
+        if self.stream is not sys.stdin.buffer:
+            self.stream.close()
+
+def to_level(db, floor=FLOOR_DB):
+    """Map dBFS values onto 0.0-1.0 meter levels"""
+    return np.clip((db - floor) / -floor, 0.0, 1.0)
+
+class Meter:
+    """Levels that fall back by decay per frame, with peaks held for hold frames"""
+
+    def __init__(self, count, decay=0.85, hold=15, fall=0.02):
+        self.levels = np.zeros(count, dtype=np.float32)
+        self.peaks = np.zeros(count, dtype=np.float32)
+        self._held = np.zeros(count, dtype=np.int32)
+        self.decay = decay
+        self.hold = hold
+        self.fall = fall
+
+    def update(self, levels):
+        self.levels *= self.decay
+        np.maximum(self.levels, levels, out=self.levels)
+        rising = self.levels >= self.peaks
+        self._held -= 1
+        self._held[rising] = self.hold
+        self.peaks[rising] = self.levels[rising]
+        falling = self._held <= 0
+        self.peaks[falling] -= self.fall
+        np.maximum(self.peaks, self.levels, out=self.peaks)
+        return self.levels
+
+class Spectrum:
+    """Hann-windowed FFT of size samples folded into log-spaced bands"""
+
+    def __init__(self, rate, bands=16, size=2048, fmin=40.0, fmax=16000.0):
+        self.size = size
+        self.window = np.hanning(size).astype(np.float32)
+        self.samples = np.zeros(size, dtype=np.float32)
+        freqs = np.fft.rfftfreq(size, 1.0 / rate)
+        edges = np.searchsorted(freqs, np.geomspace(fmin, min(fmax, rate / 2), bands + 1))
+        # Low bands are narrower than one FFT bin; give each at least one
+        for i in range(1, len(edges)):
+            edges[i] = max(edges[i], edges[i - 1] + 1)
+        self.edges = edges
+        # A full-scale sine peaks at size / 4 through a Hann window
+        self._reference = size / 4
+
+    def __call__(self, capture):
+        """Band levels (0.0-1.0) for the newest samples of an AudioCapture"""
+        capture.latest(self.samples)
+        self.samples *= self.window
+        magnitude = np.abs(np.fft.rfft(self.samples))
+        bands = np.maximum.reduceat(magnitude[:self.edges[-1]], self.edges[:-1])
+        return to_level(20 * np.log10(bands / self._reference + 1e-9))
+
+def bars(canvas, levels, peaks, palette=BAR_PALETTE, peak_color=(255, 255, 255)):
+    """Draw one vertical bar per column, rising from the bottom row"""
+    height = canvas.HEIGHT
+    rows = np.arange(height - 1, -1, -1)[:, None]
+    lit = rows < np.round(levels * height)[None, :]
+    gradient = palette[np.arange(height - 1, -1, -1) * 255 // max(height - 1, 1)]
+    np.multiply(gradient[:, None, :], lit[:, :, None], out=canvas.frame, casting='unsafe')
+    peak_rows = height - 1 - np.minimum(np.round(peaks * height).astype(int), height - 1)
+    shown = peaks > 0.0
+    canvas.frame[peak_rows[shown], np.flatnonzero(shown)] = peak_color
+    return canvas.frame
+
+def spectrum(canvas, source='alsa', rate=DEFAULT_RATE, channels=1, decay=0.85, hold=15):
+    """Pattern generator: a spectrum analyser with one log-spaced band per column.
+
+    Ends when a file or pipe source runs out.
+    """
+    capture = AudioCapture(source, rate, channels)
+    try:
+        analyse = Spectrum(capture.rate, canvas.WIDTH)
+        meter = Meter(canvas.WIDTH, decay, hold)
+        while not capture.finished:
+            meter.update(analyse(capture))
+            # Bands map onto columns left to right, low to high
+            yield bars(canvas, meter.levels, meter.peaks)
+    finally:
+        capture.close()
+
+def vu(canvas, source='alsa', rate=DEFAULT_RATE, channels=1, decay=0.9, hold=25):
+    """Pattern generator: an RMS level meter filling the panel from the left"""
+    capture = AudioCapture(source, rate, channels)
+    try:
+        block = np.zeros(capture.block, dtype=np.float32)
+        meter = Meter(1, decay, hold)
+        while not capture.finished:
+            capture.latest(block)
+            rms = np.sqrt(np.mean(np.square(block)))
+            # A full-scale sine has an RMS of -3 dBFS; count that as full
+            meter.update(to_level(20 * np.log10(rms + 1e-9) + 3.0))
+            columns = np.arange(canvas.WIDTH)
+            level = meter.levels[0] * canvas.WIDTH
+            peak = min(int(meter.peaks[0] * canvas.WIDTH), canvas.WIDTH - 1)
+            colors = BAR_PALETTE[columns * 255 // max(canvas.WIDTH - 1, 1)]
+            canvas.frame[:] = colors * (columns < level)[:, None]
+            if meter.peaks[0] > 0.0:
+                canvas.frame[:, peak] = (255, 255, 255)
+            yield canvas.frame
+    finally:
+        capture.close()
@@ -0,0 +1,350 @@
+"""Output backends: where NeoMatrix sends each frame.
+
+Every backend takes (N, 3) uint8 RGB data in LED chain order in show().
+The hardware libraries are imported only when their backend starts, so
+this module (and everything built on it) loads on any machine.
+"""
+import ctypes
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+# GPIO pins driven by PWM channel 1; everything else (PWM0 18/12, PCM 21, SPI 10) is channel 0
+PWM1_PINS = (13, 19, 41, 45, 53)
+
+# The peripheral behind each ws281x-capable pin. A PixelStrip owns its
+# peripheral outright, so each one can drive a single chain: two strips on
+# PWM (even on channels 0 and 1) reset each other.
+PERIPHERALS = {
+    12: 'PWM', 18: 'PWM', 40: 'PWM', 52: 'PWM', 13: 'PWM', 19: 'PWM', 41: 'PWM', 45: 'PWM', 53: 'PWM',
+    21: 'PCM', 31: 'PCM',
+    10: 'SPI', 38: 'SPI',
+}
+
+def channel_for_pin(pin):
+    """The ws281x channel that drives a GPIO pin"""
+    return 1 if pin in PWM1_PINS else 0
+
+def peripheral_for_pin(pin):
+    """'PWM', 'PCM' or 'SPI' for a pin ws281x can drive; raises ValueError otherwise"""
+    try:
+        return PERIPHERALS[pin]
+    except KeyError:
+        raise ValueError(f"GPIO {pin} can't drive a ws281x strip, use one of {sorted(PERIPHERALS)}") from None
+
+def brightness_level(brightness):
+    """A brightness as the 0-255 level every backend takes.
+
+    Integers are already levels; floats are fractions from 0.0 to 1.0.
+    Raises TypeError or ValueError for anything else.
+    """
+    if isinstance(brightness, bool) or not isinstance(brightness, (int, float, np.integer, np.floating)):
+        raise TypeError(f"brightness must be a number, not {brightness!r}")
+    if isinstance(brightness, (float, np.floating)):
+        if not 0.0 <= brightness <= 1.0:
+            raise ValueError(f"brightness {brightness!r} out of range 0.0-1.0")
+        return round(float(brightness) * 255)
+    if not 0 <= brightness <= 255:
+        raise ValueError(f"brightness {brightness!r} out of range 0-255")
+    return int(brightness)
+
+class Backend:
+    """Base class for frame outputs"""
+
+    def __init__(self, count):
+        self.count = count
+
+    def begin(self):
+        """Acquire the output; called once before the first show()"""
+
+    def show(self, leds):
+        """Push one (count, 3) frame of LED-ordered RGB data"""
+        raise NotImplementedError
+
+    def set_brightness(self, brightness):
+        """Change the global brightness (a 0-255 level), where the output supports it"""
+
+    def close(self):
+        """Release the output"""
+
+def wire_time(count, freq_hz=800000, reset_us=300):
+    """Seconds to clock a frame out to count LEDs: 24 bits each plus the latch gap"""
+    return count * 24 / freq_hz + reset_us / 1e6
+
+def require_root(script):
+    """Exit with a usage hint unless running as root, which ws281x needs for /dev/mem"""
+    if hasattr(os, 'geteuid') and os.geteuid() != 0:
+        print("This script must be run with sudo privileges to drive the LEDs.")
+        print(f"Usage: sudo python3 {script} ...  (or --backend null to run without hardware)")
+        sys.exit(1)
+
+def _led_buffer(strip, count):
+    """Return a uint32 NumPy view of the strip's LED buffer, or None.
+
+    rpi_ws281x has no bulk setter, but its SWIG pointer to the channel's
+    LED array converts to an address we can wrap without copying.
+    """
+    try:
+        import _rpi_ws281x as ws
+        address = int(ws.ws2811_channel_t_leds_get(strip._channel))
+    except (ImportError, AttributeError, TypeError):
+        return None
+    if not address:
+        return None
+    return np.ctypeslib.as_array((ctypes.c_uint32 * count).from_address(address))
+
+class WS281xBackend(Backend):
+    """rpi_ws281x PixelStrip on a PWM/PCM/SPI pin (needs sudo)"""
+
+    def __init__(self, count, pin=18, brightness=50, channel=0,
+                 freq_hz=800000, dma=10, invert=False):
+        super().__init__(count)
+        self.pin = pin
+        self.brightness = brightness
+        self.channel = channel
+        self.freq_hz = freq_hz
+        self.dma = dma
+        self.invert = invert
+        self.strip = None
+        # Scratch buffers for packing, allocated once
+        self._packed = np.empty(count, dtype=np.uint32)
+        self._channel_tmp = np.empty(count, dtype=np.uint32)
+        self._strip_buffer = None
+
+    def begin(self):
+        from rpi_ws281x import PixelStrip
+        # Create and initialize the NeoPixel strip
+        self.strip = PixelStrip(self.count, self.pin, self.freq_hz, self.dma,
+                                self.invert, self.brightness, self.channel)
+        self.strip.begin()
+        # Pack straight into the strip's own LED buffer when we can reach it
+        self._strip_buffer = _led_buffer(self.strip, self.count)
+        if self._strip_buffer is not None:
+            self._packed = self._strip_buffer
+
+    def show(self, leds):
+        # Pack to the 0x00RRGGBB words the driver expects
+        packed, tmp = self._packed, self._channel_tmp
+        np.left_shift(leds[:, 0], 16, out=packed, dtype=np.uint32)
+        np.left_shift(leds[:, 1], 8, out=tmp, dtype=np.uint32)
+        np.bitwise_or(packed, tmp, out=packed)
+        np.bitwise_or(packed, leds[:, 2], out=packed)
+
+        if self._strip_buffer is None:
+            # No direct buffer access, fall back to the per-LED API
+            for i, value in enumerate(packed.tolist()):
+                self.strip.setPixelColor(i, value)
+        self.strip.show()
+
+    def set_brightness(self, brightness):
+        if self.strip is not None:
+            self.strip.setBrightness(brightness)
+        self.brightness = brightness
+
+class CircuitPythonBackend(Backend):
+    """Adafruit CircuitPython NeoPixel on a board pin such as 'D18'
+
+    brightness is a 0-255 level like every backend's; the library's own
+    0.0-1.0 fraction is derived from it.
+    """
+
+    def __init__(self, count, pin='D18', brightness=51, pixel_order='GRB'):
+        super().__init__(count)
+        self.pin = pin
+        self.brightness = brightness
+        self.pixel_order = pixel_order
+        self.pixels = None
+
+    def begin(self):
+        import board
+        import neopixel
+        self.pixels = neopixel.NeoPixel(
+            getattr(board, self.pin), self.count, brightness=self.brightness / 255.0,
+            auto_write=False, pixel_order=getattr(neopixel, self.pixel_order)
+        )
+
+    def show(self, leds):
+        self.pixels[:] = [tuple(rgb) for rgb in leds.tolist()]
+        self.pixels.show()
+
+    def set_brightness(self, brightness):
+        if self.pixels is not None:
+            self.pixels.brightness = brightness / 255.0
+        self.brightness = brightness
+
+    def close(self):
+        if self.pixels is not None:
+            self.pixels.deinit()
+
+class _ChainWorker:
+    """Runs one chain's show() on its own thread, one frame at a time"""
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.leds = None
+        self.error = None
+        self._go = threading.Event()
+        self._done = threading.Event()
+        self._done.set()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, leds):
+        self._done.clear()
+        self.leds = leds
+        self._go.set()
+
+    def wait(self):
+        self._done.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _run(self):
+        while True:
+            self._go.wait()
+            self._go.clear()
+            if self.leds is None:
+                return
+            try:
+                self.backend.show(self.leds)
+            except Exception as e:
+                self.error = e
+            finally:
+                self._done.set()
+
+    def close(self):
+        self._done.wait()
+        self.leds = None
+        self._go.set()
+        self._thread.join()
+
+class MultiBackend(Backend):
+    """Splits one LED-ordered frame across several chains pushed in parallel.
+
+    Each backend drives the next backend.count LEDs of the combined chain
+    order, so with a tiled mapping every chain gets whole panels. Extra
+    chains are pushed from their own threads, so a frame costs the longest
+    chain rather than the sum, and chains whose LEDs did not change are
+    skipped.
+    """
+
+    def __init__(self, backends, skip_unchanged=True):
+        super().__init__(sum(backend.count for backend in backends))
+        self.backends = list(backends)
+        self.skip_unchanged = skip_unchanged
+        self.ranges = []
+        start = 0
+        for backend in self.backends:
+            self.ranges.append((start, start + backend.count))
+            start += backend.count
+        # Last data pushed to each chain
+        self._sent = [np.zeros((backend.count, 3), dtype=np.uint8) for backend in self.backends]
+        self._sent_valid = [False] * len(self.backends)
+        self.pushes = [0] * len(self.backends)
+        self._workers = []
+
+    def begin(self):
+        for backend in self.backends:
+            backend.begin()
+        self._workers = [_ChainWorker(backend, f'led-chain-{i}')
+                         for i, backend in enumerate(self.backends[1:], 1)]
+
+    def _changed(self, i, leds):
+        if self.skip_unchanged and self._sent_valid[i] and np.array_equal(leds, self._sent[i]):
+            return False
+        np.copyto(self._sent[i], leds)
+        self._sent_valid[i] = True
+        self.pushes[i] += 1
+        return True
+
+    def show(self, leds):
+        chains = [leds[start:end] for start, end in self.ranges]
+        busy = []
+        for i, worker in enumerate(self._workers, 1):
+            if self._changed(i, chains[i]):
+                # Workers read their private copy, so the caller may reuse leds
+                worker.submit(self._sent[i])
+                busy.append(worker)
+        if self._changed(0, chains[0]):
+            self.backends[0].show(chains[0])
+        for worker in busy:
+            worker.wait()
+
+    def set_brightness(self, brightness):
+        for backend in self.backends:
+            backend.set_brightness(brightness)
+        self._sent_valid = [False] * len(self.backends)
+
+    def close(self):
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+        for backend in self.backends:
+            backend.close()
+
+class NullBackend(Backend):
+    """Discards frames; for timing render cost without any output"""
+
+    def __init__(self, count):
+        super().__init__(count)
+        self.shown = 0
+
+    def show(self, leds):
+        self.shown += 1
+
+class SimulatedBackend(NullBackend):
+    """Stands in for a strip by taking as long as the real wire transfer would.
+
+    With blocking set, show() returns once the frame has been clocked out,
+    like bit-banged drivers. Otherwise it behaves like rpi_ws281x's DMA:
+    show() waits only for the previous transfer to finish, then returns
+    while this one goes out. latency adds fixed driver overhead per show().
+    """
+
+    def __init__(self, count, freq_hz=800000, latency=0.0, blocking=False, reset_us=300):
+        super().__init__(count)
+        self.freq_hz = freq_hz
+        self.latency = latency
+        self.blocking = blocking
+        self.wire_time = wire_time(count, freq_hz, reset_us)
+        self._busy_until = 0.0
+
+    def _sleep_until(self, deadline):
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def show(self, leds):
+        self._sleep_until(self._busy_until)
+        started = time.monotonic() + self.latency
+        self._busy_until = started + self.wire_time
+        self._sleep_until(self._busy_until if self.blocking else started)
+        self.shown += 1
+
+class RecordingBackend(NullBackend):
+    """Keeps the most recent frames in a preallocated ring buffer"""
+
+    def __init__(self, count, capacity=256):
+        super().__init__(count)
+        self.capacity = capacity
+        self.ring = np.zeros((capacity, count, 3), dtype=np.uint8)
+
+    def show(self, leds):
+        np.copyto(self.ring[self.shown % self.capacity], leds)
+        self.shown += 1
+
+    def last(self):
+        """The most recently shown frame, or None"""
+        if not self.shown:
+            return None
+        return self.ring[(self.shown - 1) % self.capacity]
+
+    def frames(self):
+        """The retained frames, oldest first"""
+        if self.shown <= self.capacity:
+            return self.ring[:self.shown].copy()
+        start = self.shown % self.capacity
+        return np.concatenate((self.ring[start:], self.ring[:start]))
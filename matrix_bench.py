@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Benchmark every registered pattern headless and report JSON.
+
+For each pattern and panel size this measures per-frame render latency
+(stepping the generator), push latency (NeoMatrix.show() into a null
+backend, i.e. remap and hand-off cost), bytes allocated per frame and the
+resulting maximum sustainable frame rate: max_fps for the CPU alone, and
+wire_limited_fps, which also can't beat the time it takes to clock the
+frame out to a single 800 kHz WS281x chain.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+import numpy as np
+import matrix_display
+import matrix_patterns
+from matrix_audio import DEFAULT_RATE
+from matrix_backends import NullBackend, wire_time
+from matrix_display import AUDIO_PATTERNS, NeoMatrix
+from matrix_engine import Canvas, frames
+from matrix_mapping import get_mapping
+
+# Pattern sets to benchmark, by module name
+REGISTRIES = {
+    'matrix_display': matrix_display.PATTERNS,
+    'matrix_patterns': matrix_patterns.PATTERNS,
+}
+
+# Panel geometries: one 16x16 panel, then 2x2 and 4x4 chained panels
+SIZES = {
+    '16x16': get_mapping(16, 16),
+    '32x32': get_mapping(16, 16, tiles_x=2, tiles_y=2),
+    '64x64': get_mapping(16, 16, tiles_x=4, tiles_y=4),
+}
+
+def synthetic_wav(path, seconds=10.0, rate=DEFAULT_RATE):
+    """Write a 16-bit mono WAV (a rising sweep over noise) for the audio patterns"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    # Sweep 40 Hz to 16 kHz exponentially, so every band lights up in turn
+    phase = 2 * np.pi * 40.0 * seconds / np.log(400.0) * (400.0 ** (t / seconds) - 1)
+    signal = 0.6 * np.sin(phase) + 0.1 * rng.standard_normal(t.size)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes((np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes())
+
+def looped(spec, mapping, params=None):
+    """Frames from a pattern, restarting it whenever it finishes"""
+    while True:
+        empty = True
+        for frame in frames(spec, Canvas(mapping), **(params or {})):
+            empty = False
+            yield frame
+        if empty:
+            return
+
+def percentiles(samples):
+    """Latency summary in milliseconds"""
+    ms = samples * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {'mean': float(ms.mean()), 'p50': float(p50), 'p90': float(p90),
+            'p99': float(p99), 'max': float(ms.max())}
+
+def bench_pattern(spec, mapping, count=200, alloc_frames=50, params=None):
+    """Time count frames of one pattern on one geometry"""
+    random.seed(0)
+    matrix = NeoMatrix(mapping=mapping, backend=NullBackend(mapping.count))
+    stream = looped(spec, mapping, params)
+    render = np.empty(count)
+    push = np.empty(count)
+    clock = time.perf_counter
+
+    for k in range(count):
+        began = clock()
+        frame = next(stream)
+        rendered = clock()
+        np.copyto(matrix.frame, frame)
+        matrix.show()
+        render[k] = rendered - began
+        push[k] = clock() - rendered
+
+    # Separate pass for allocations, since tracing slows everything down
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(alloc_frames):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        np.copyto(matrix.frame, next(stream))
+        matrix.show()
+        allocated += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    # Finish the pattern now, so an audio capture thread doesn't outlive the run
+    stream.close()
+
+    frame_time = render.mean() + push.mean()
+    max_fps = 1.0 / frame_time if frame_time > 0 else None
+    wire_fps = 1.0 / wire_time(mapping.count)
+    return {
+        'render_ms': percentiles(render),
+        'push_ms': percentiles(push),
+        'alloc_bytes_per_frame': allocated / alloc_frames,
+        'max_fps': max_fps,
+        # A real strip can't go faster than its data rate
+        'wire_limited_fps': wire_fps if max_fps is None else min(max_fps, wire_fps),
+        'max_fps_p99': 1.0 / np.percentile(render + push, 99),
+    }
+
+def run_benchmarks(count=200, sizes=None, patterns=None, alloc_frames=50, log=None):
+    """Benchmark every selected pattern and size, returning the report dict
+
+    The audio patterns play a synthetic WAV file instead of recording.
+    """
+    results = []
+    audio = tempfile.TemporaryDirectory()
+    wav = os.path.join(audio.name, 'sweep.wav')
+    synthetic_wav(wav)
+    for module, registry in REGISTRIES.items():
+        for spec in registry:
+            if patterns and spec.name not in patterns and f"{module}.{spec.name}" not in patterns:
+                continue
+            params = None
+            if registry is matrix_display.PATTERNS and spec.name in AUDIO_PATTERNS:
+                params = {'source': wav}
+            for size in sizes or SIZES:
+                result = {'module': module, 'pattern': spec.name, 'size': size}
+                result.update(bench_pattern(spec, SIZES[size], count, alloc_frames, params))
+                results.append(result)
+                if log:
+                    print(f"{module}.{spec.name:<10} {size:>6}  "
+                          f"render p50 {result['render_ms']['p50']:7.3f} ms  "
+                          f"push p50 {result['push_ms']['p50']:6.3f} ms  "
+                          f"{result['alloc_bytes_per_frame']:8.0f} B/frame  "
+                          f"max {result['max_fps']:8.1f} fps, "
+                          f"{result['wire_limited_fps']:6.1f} on a strip", file=log)
+    audio.cleanup()
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'frames': count,
+        'results': results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark matrix patterns without hardware')
+    parser.add_argument('--frames', type=int, default=200, help='Frames to time per pattern and size')
+    parser.add_argument('--size', action='append', choices=list(SIZES),
+                        help='Panel size to test (repeatable, default all)')
+    parser.add_argument('--pattern', action='append',
+                        help='Pattern name or module.name to test (repeatable, default all)')
+    parser.add_argument('--alloc-frames', type=int, default=50,
+                        help='Frames traced for allocation counts')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.frames, args.size, args.pattern, args.alloc_frames, log=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
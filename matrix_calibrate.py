@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Measure how fast the strip can really be refreshed, and remember it.
+
+Two timing runs are made against the configured backend:
+
+- spaced: one show() at a time with idle gaps longer than a transfer, which
+  gives the cost of show() itself. If that is close to the wire time the
+  driver blocks until the frame is out; if it is much shorter the transfer
+  runs asynchronously (DMA) and overlaps with rendering.
+- back to back: show() called continuously, which gives the real minimum
+  frame interval, wire time and driver overhead included.
+
+The theoretical wire time is N * 24 bits / LED_FREQ_HZ plus the latch
+gap. The result is saved as a hardware profile keyed by pin, DMA channel,
+frequency and LED count; the display scripts read it and never run a
+pattern faster than the safe frame rate it records.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import numpy as np
+from matrix_backends import SimulatedBackend, WS281xBackend, channel_for_pin, require_root, wire_time
+from matrix_mapping import add_mapping_arguments, mapping_from_args
+
+DEFAULT_PROFILE = os.path.expanduser('~/.config/wyp-pi/hardware.json')
+# Fraction of the measured maximum frame rate the render loop may use
+SAFETY = 0.9
+# show() taking at least this fraction of the wire time counts as blocking
+BLOCKING_FRACTION = 0.5
+
+def profile_key(backend):
+    """The hardware profile entry for a backend, or None if it has no wire timing"""
+    if isinstance(backend, WS281xBackend):
+        return f"ws281x pin={backend.pin} dma={backend.dma} freq={backend.freq_hz} leds={backend.count}"
+    if isinstance(backend, SimulatedBackend):
+        return f"simulated freq={backend.freq_hz} leds={backend.count}"
+    return None
+
+def _percentiles(samples):
+    p50, p99 = np.percentile(samples, (50, 99))
+    return {'p50_ms': round(p50 * 1000, 3), 'p99_ms': round(p99 * 1000, 3)}
+
+def calibrate(backend, frames=200, freq_hz=800000, reset_us=300):
+    """Time show() on a started backend; returns the profile as a dict"""
+    theoretical = wire_time(backend.count, freq_hz, reset_us)
+    # A dim test frame keeps the current draw low; alternating it defeats any
+    # driver-side skipping of unchanged data
+    test_frames = np.zeros((2, backend.count, 3), dtype=np.uint8)
+    test_frames[0, ::2] = 8
+    test_frames[1, 1::2] = 8
+
+    # Spaced: the cost of one show() when the link is idle
+    spaced = np.empty(frames // 2)
+    for i in range(len(spaced)):
+        time.sleep(2 * theoretical + 0.001)
+        began = time.perf_counter()
+        backend.show(test_frames[i & 1])
+        spaced[i] = time.perf_counter() - began
+
+    # Back to back: the real minimum frame interval
+    intervals = np.empty(frames)
+    backend.show(test_frames[0])
+    last = time.perf_counter()
+    for i in range(frames):
+        backend.show(test_frames[i & 1])
+        now = time.perf_counter()
+        intervals[i] = now - last
+        last = now
+    backend.show(np.zeros((backend.count, 3), dtype=np.uint8))
+
+    show_time = float(np.median(spaced))
+    interval = float(np.percentile(intervals, 99))
+    max_fps = 1.0 / float(np.median(intervals))
+    return {
+        'leds': backend.count,
+        'freq_hz': freq_hz,
+        'wire_ms': round(theoretical * 1000, 3),
+        'theoretical_fps': round(1.0 / theoretical, 1),
+        'show': _percentiles(spaced),
+        'interval': _percentiles(intervals),
+        'blocking': show_time >= BLOCKING_FRACTION * theoretical,
+        'max_fps': round(max_fps, 1),
+        # Sized by the slow tail, so the loop keeps up frame after frame; never
+        # 0, which callers would read as no limit
+        'safe_fps': max(1, math.floor(SAFETY / interval)),
+        'measured': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+def load_profiles(path=DEFAULT_PROFILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_profile(key, profile, path=DEFAULT_PROFILE):
+    """Store one backend's profile, keeping the others in the file"""
+    profiles = load_profiles(path)
+    profiles[key] = profile
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(profiles, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def safe_fps(backend, path=DEFAULT_PROFILE):
+    """The calibrated frame rate limit for a backend, or None if it was never measured"""
+    key = profile_key(backend)
+    if key is None:
+        return None
+    fps = load_profiles(path).get(key, {}).get('safe_fps')
+    return None if fps is None else max(1, fps)
+
+def add_profile_arguments(parser):
+    """Add --profile to an argparse parser"""
+    parser.add_argument('--profile', default=DEFAULT_PROFILE,
+                        help=f'Hardware profile file written by matrix_calibrate.py (default {DEFAULT_PROFILE})')
+
+def report(key, profile):
+    blocking = 'blocks until the frame is out' if profile['blocking'] else 'returns early (asynchronous DMA)'
+    return "\n".join([
+        f"{key}",
+        f"  wire time      {profile['wire_ms']:.3f} ms -> at most {profile['theoretical_fps']:.1f} fps",
+        f"  show()         p50 {profile['show']['p50_ms']:.3f} ms, p99 {profile['show']['p99_ms']:.3f} ms: {blocking}",
+        f"  frame interval p50 {profile['interval']['p50_ms']:.3f} ms, p99 {profile['interval']['p99_ms']:.3f} ms",
+        f"  measured       {profile['max_fps']:.1f} fps max, {profile['safe_fps']} fps safe",
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure LED strip refresh timing and save a hardware profile')
+    parser.add_argument('--pin', type=int, default=18, help='GPIO pin number')
+    parser.add_argument('--dma', type=int, default=10, help='DMA channel')
+    parser.add_argument('--freq', type=int, default=800000, help='LED signal frequency in Hz')
+    parser.add_argument('--frames', type=int, default=200, help='Frames to time in each run')
+    parser.add_argument('--simulate', action='store_true',
+                        help='Time a simulated strip instead of the hardware')
+    parser.add_argument('--latency', type=float, default=0.0, metavar='SECONDS',
+                        help='Driver overhead per show() for --simulate')
+    parser.add_argument('--blocking', action='store_true',
+                        help='Make the --simulate strip block until each frame is out')
+    add_profile_arguments(parser)
+    parser.add_argument('--no-save', action='store_true', help="Report only; don't update the profile")
+    add_mapping_arguments(parser)
+    args = parser.parse_args()
+
+    mapping = mapping_from_args(args)
+    if args.simulate:
+        backend = SimulatedBackend(mapping.count, args.freq, args.latency, args.blocking)
+    else:
+        require_root('matrix_calibrate.py')
+        backend = WS281xBackend(mapping.count, args.pin, 50, channel_for_pin(args.pin),
+                                freq_hz=args.freq, dma=args.dma)
+    backend.begin()
+    try:
+        profile = calibrate(backend, args.frames, args.freq)
+    except KeyboardInterrupt:
+        sys.exit(1)
+    finally:
+        backend.close()
+    key = profile_key(backend)
+    print(report(key, profile))
+    if not args.no_save:
+        save_profile(key, profile, args.profile)
+        print(f"Saved to {args.profile}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Deadline-based frame pacing for pattern generators."""
+import time
+
+class FrameClock:
+    """Paces frames against fixed monotonic deadlines.
+
+    Frame k is due at start + k / fps, so render and transmit time come out
+    of the frame period instead of adding to it. When we fall more than a
+    frame behind, frames are dropped (rendered but not shown) to catch up.
+    """
+
+    def __init__(self, fps=50, max_drop=4):
+        self.fps = fps
+        self.period = 1.0 / fps
+        # Never drop more than this many frames in a row; resync instead
+        self.max_drop = max_drop
+        self.start()
+
+    def start(self):
+        """Reset the deadlines and counters"""
+        self.started = time.monotonic()
+        self.deadline = self.started + self.period
+        self.shown = 0
+        self.dropped = 0
+        self.resyncs = 0
+        self._drop_run = 0
+
+    def should_drop(self, render_time=0.0):
+        """True if the frame just rendered is already a whole period late.
+
+        Frames are only dropped to save transmit time: if rendering alone
+        takes a whole period, skipping show() cannot catch us up.
+        """
+        if (time.monotonic() - self.deadline < self.period
+                or render_time >= self.period
+                or self._drop_run >= self.max_drop):
+            return False
+        self._drop_run += 1
+        self.dropped += 1
+        self.deadline += self.period
+        return True
+
+    def wait(self, periods=1):
+        """Count a shown frame and sleep until the next deadline
+
+        periods > 1 holds the frame for that many frame periods.
+        """
+        self.shown += 1
+        self._drop_run = 0
+        self.deadline += (periods - 1) * self.period
+        now = time.monotonic()
+        slack = self.deadline - now
+        if slack > 0:
+            time.sleep(slack)
+        elif -slack > self.max_drop * self.period:
+            # Hopelessly behind: start counting from now rather than bursting
+            self.deadline = now
+            self.resyncs += 1
+        self.deadline += self.period
+        return slack
+
+    def achieved_fps(self):
+        """Frames actually shown per second since start()"""
+        elapsed = time.monotonic() - self.started
+        return self.shown / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        """Achieved vs target rate and drop counts"""
+        return {
+            'target_fps': self.fps,
+            'achieved_fps': self.achieved_fps(),
+            'shown': self.shown,
+            'dropped': self.dropped,
+            'resyncs': self.resyncs,
+        }
+
+    def summary(self):
+        """One-line report of achieved vs target rate"""
+        return (f"{self.achieved_fps():.1f}/{self.fps:g} fps, "
+                f"{self.shown} shown, {self.dropped} dropped")
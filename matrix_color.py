@@ -0,0 +1,76 @@
+"""Color helpers and precomputed 256-entry color lookup tables.
+
+Palettes are (256, 3) uint8 arrays indexed by a 0-255 position, so coloring
+a whole frame is one gather: ``PALETTE[positions]``. Gamma and brightness
+tables are (256,) uint8 arrays applied per channel with apply_lut().
+"""
+import colorsys
+import functools
+import numpy as np
+
+def Color(red, green, blue, white=0):
+    """Pack a color the way rpi_ws281x.Color does"""
+    return (white << 24) | (red << 16) | (green << 8) | blue
+
+def color_to_rgb(color):
+    """Unpack a Color() value (or pass through an (r, g, b) tuple)"""
+    if isinstance(color, int):
+        return ((color >> 16) & 255, (color >> 8) & 255, color & 255)
+    return tuple(color)
+
+def _wheel_rgb(pos):
+    """Rainbow color for one 0-255 position as an (r, g, b) tuple"""
+    if pos < 85:
+        return (pos * 3, 255 - pos * 3, 0)
+    elif pos < 170:
+        pos -= 85
+        return (255 - pos * 3, 0, pos * 3)
+    else:
+        pos -= 170
+        return (0, pos * 3, 255 - pos * 3)
+
+# The classic NeoPixel color wheel: red -> green -> blue -> back to red
+WHEEL = np.array([_wheel_rgb(pos) for pos in range(256)], dtype=np.uint8)
+
+def wheel(pos):
+    """Generate rainbow colors across 0-255 positions."""
+    return tuple(WHEEL[pos & 255].tolist())
+
+def hsv_palette(saturation=1.0, value=1.0):
+    """256 evenly spaced hues at a fixed saturation and value"""
+    rgb = [colorsys.hsv_to_rgb(i / 256.0, saturation, value) for i in range(256)]
+    return np.round(np.array(rgb) * 255).astype(np.uint8)
+
+# Full-saturation HSV hue circle (smoother than WHEEL, which dims mid-way)
+HUES = hsv_palette()
+
+def make_palette(colors, positions=None):
+    """Build a 256-entry palette blending linearly between color stops.
+
+    The stops are spread evenly along 0-255 unless positions are given.
+    """
+    if positions is None:
+        positions = np.linspace(0, 255, len(colors))
+    stops = np.array([color_to_rgb(color) for color in colors], dtype=float)
+    index = np.arange(256)
+    return np.stack([np.interp(index, positions, stops[:, c]) for c in range(3)],
+                    axis=1).round().astype(np.uint8)
+
+@functools.lru_cache(maxsize=None)
+def gamma_lut(gamma=2.8):
+    """Per-channel gamma correction table (gamma 1.0 is the identity)"""
+    return np.round(255.0 * (np.arange(256) / 255.0) ** gamma).astype(np.uint8)
+
+@functools.lru_cache(maxsize=256)
+def brightness_lut(level):
+    """Per-channel table scaling 0-255 values by level/255"""
+    return (np.arange(256) * level // 255).astype(np.uint8)
+
+def apply_lut(frame, lut, out=None):
+    """Map every channel value of a uint8 array through a 256-entry table"""
+    # mode='clip' keeps np.take from buffering when out= is given
+    return np.take(lut, frame, out=out, mode='clip')
+
+def scale(frame, level, out=None):
+    """Scale a whole uint8 frame (or color array) to level/255 brightness"""
+    return apply_lut(frame, brightness_lut(int(level)), out=out)
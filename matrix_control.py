@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Runtime control of a running Engine over line-delimited JSON.
+
+The server listens on a Unix socket (and optionally TCP) from an asyncio loop
+in a background thread. Each request is one JSON object per line and gets one
+JSON reply line:
+
+    {"cmd": "pattern", "name": "bounce", "params": {"iterations": 10}}
+    {"cmd": "params", "params": {"text": "HELLO"}}
+    {"cmd": "brightness", "level": 30}      (0-255, or 0.0-1.0 as a float)
+    {"cmd": "fps", "fps": 25}            (null for each pattern's own rate)
+    {"cmd": "status"}
+    {"cmd": "patterns"}
+    {"cmd": "profile", "on": true}       (needs metrics enabled)
+
+Replies are {"ok": true, ...} or {"ok": false, "error": "..."}. Changes are
+handed to the engine and applied at the next frame boundary, so the render
+loop never waits on a client.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+from matrix_backends import brightness_level
+
+DEFAULT_SOCKET = '/tmp/wyp-pi.sock'
+
+class ControlServer:
+    """Serves control requests for an Engine from its own thread"""
+
+    def __init__(self, engine, path=DEFAULT_SOCKET, host='127.0.0.1', port=None):
+        self.engine = engine
+        self.path = path
+        self.host = host
+        self.port = port
+        self.clients = 0
+        self.requests = 0
+        self._loop = None
+        self._servers = []
+        self._error = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='control', daemon=True)
+
+    def start(self):
+        """Start listening; returns once the sockets are bound, or raises OSError"""
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            raise self._error
+        return self
+
+    def _run(self):
+        # asyncio is slow to import, so only pay for it once a server starts
+        import asyncio
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._listen())
+        except Exception as e:
+            # Handed to start(), which raises it in the caller's thread
+            self._error = e
+        self._ready.set()
+        if self._error is None:
+            self._loop.run_forever()
+        for server in self._servers:
+            server.close()
+            self._loop.run_until_complete(server.wait_closed())
+        self._loop.close()
+
+    async def _listen(self):
+        import asyncio
+        if self.path:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._servers.append(await asyncio.start_unix_server(self._client, self.path))
+        if self.port is not None:
+            self._servers.append(await asyncio.start_server(self._client, self.host, self.port))
+
+    async def _client(self, reader, writer):
+        self.clients += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(json.dumps(self.handle_line(line), default=repr).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    def handle_line(self, line):
+        """Decode one request line and return the reply"""
+        self.requests += 1
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            return {'ok': True, **self.handle(request)}
+        except (ValueError, KeyError, TypeError, RuntimeError) as e:
+            message = e.args[0] if isinstance(e, KeyError) and e.args else str(e)
+            return {'ok': False, 'error': message}
+
+    def handle(self, request):
+        """Apply one decoded request to the engine"""
+        cmd = request.get('cmd')
+        engine = self.engine
+        if cmd == 'pattern':
+            engine.switch(request['name'], **request.get('params', {}))
+        elif cmd == 'params':
+            engine.update(**request['params'])
+        elif cmd == 'brightness':
+            engine.defer(engine.matrix.set_brightness, brightness_level(request['level']))
+        elif cmd == 'fps':
+            fps = float(request['fps']) if request.get('fps') else None
+            if fps is not None and not 0 < fps <= 1000:
+                raise ValueError(f"fps {fps:g} out of range")
+            engine.set_fps(fps)
+        elif cmd == 'status':
+            status = engine.status()
+            power = getattr(engine.matrix, 'power', None)
+            if power:
+                status['power'] = power.stats()
+            if engine.metrics:
+                status['metrics'] = engine.metrics.stats()
+            return status
+        elif cmd == 'profile':
+            if not engine.metrics:
+                raise RuntimeError("metrics are not enabled")
+            engine.metrics.set_profiling(request.get('on', True))
+        elif cmd == 'patterns':
+            return {'patterns': engine.registry.names()}
+        else:
+            raise ValueError(f"unknown command {cmd!r}")
+        return {}
+
+    def close(self):
+        """Stop serving and remove the socket file"""
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+def add_control_arguments(parser):
+    """Add --control/--control-port to an argparse parser"""
+    parser.add_argument('--control', nargs='?', const=DEFAULT_SOCKET, default=None,
+                        metavar='SOCKET',
+                        help=f'Accept runtime commands on a Unix socket (default {DEFAULT_SOCKET})')
+    parser.add_argument('--control-port', type=int, default=None,
+                        help='Also accept runtime commands on this TCP port')
+    parser.add_argument('--control-host', default='127.0.0.1',
+                        help='Address for --control-port (default 127.0.0.1; 0.0.0.0 for all)')
+
+def server_from_args(engine, args):
+    """Start a ControlServer if the command line asked for one"""
+    if args.control is None and args.control_port is None:
+        return None
+    return ControlServer(engine, args.control, args.control_host, args.control_port).start()
+
+def send_command(request, path=DEFAULT_SOCKET, host=None, port=None):
+    """Send one request to a ControlServer and return its reply"""
+    if port is not None:
+        sock = socket.create_connection((host or '127.0.0.1', port))
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+    with sock, sock.makefile('rwb') as f:
+        f.write(json.dumps(request).encode() + b'\n')
+        f.flush()
+        return json.loads(f.readline())
+
+def main():
+    parser = argparse.ArgumentParser(description='Send a command to a running matrix display')
+    parser.add_argument('cmd', choices=['pattern', 'params', 'brightness', 'fps', 'status', 'patterns',
+                                        'profile'])
+    parser.add_argument('value', nargs='?', default=None,
+                        help='Pattern name, brightness level, fps, on/off for profile, '
+                             'or a JSON object for params')
+    parser.add_argument('--params', default=None, help='JSON parameters for the pattern command')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Unix socket path')
+    parser.add_argument('--host', default=None, help='Connect over TCP to this host')
+    parser.add_argument('--port', type=int, default=None, help='Connect over TCP to this port')
+    args = parser.parse_args()
+
+    if args.value is None and args.cmd in ('pattern', 'brightness'):
+        parser.error(f"{args.cmd} needs a value")
+    request = {'cmd': args.cmd}
+    if args.cmd == 'pattern':
+        request['name'] = args.value
+        request['params'] = json.loads(args.params) if args.params else {}
+    elif args.cmd == 'params':
+        request['params'] = json.loads(args.value or '{}')
+    elif args.cmd == 'brightness':
+        request['level'] = float(args.value) if '.' in args.value else int(args.value)
+    elif args.cmd == 'fps':
+        request['fps'] = float(args.value) if args.value else None
+    elif args.cmd == 'profile':
+        request['on'] = args.value != 'off'
+
+    reply = send_command(request, args.socket, args.host, args.port)
+    print(json.dumps(reply, indent=2))
+    sys.exit(0 if reply.get('ok') else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Long-running matrix player driven by a scheduled playlist file.
+
+The strip is started once and every cache (mappings, color tables, text
+strips) stays warm from one entry to the next, so this is the script to
+run on boot. A playlist is JSON:
+
+    {
+      "transition": "crossfade", "fade": 1.0, "seconds": 60, "brightness": 50,
+      "entries": [
+        {"pattern": "rainbow", "seconds": 120},
+        {"pattern": "text", "params": {"text": "Good morning"},
+         "between": ["07:00", "09:00"], "days": ["mon", "tue", "wed", "thu", "fri"]},
+        {"off": true, "between": ["23:00", "07:00"]},
+        {"pattern": "overlay", "brightness": 120}
+      ]
+    }
+
+Entries play in turn. While any entry with a "between" window (which may
+wrap past midnight) is active, only those windowed entries play; otherwise
+the unwindowed ones do. "off" shows black. Top-level seconds and
+brightness are defaults for entries. The file is re-read when it
+changes: the entry on screen keeps playing and the next one comes from the
+new playlist, so a reload never interrupts the frame stream. transition and
+fade are read at startup.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+from matrix_backends import NullBackend, brightness_level, require_root
+from matrix_calibrate import DEFAULT_PROFILE, add_profile_arguments, safe_fps
+from matrix_control import add_control_arguments, server_from_args
+from matrix_display import NeoMatrix, PATTERNS
+from matrix_engine import Engine, PatternRegistry
+from matrix_mapping import add_mapping_arguments, mapping_from_args
+from matrix_metrics import add_metrics_arguments, metrics_from_args
+from matrix_power import add_power_arguments, power_from_args
+from matrix_transitions import TRANSITIONS, sequence
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+# How long black is shown before the schedule is checked again when nothing is due
+IDLE_SECONDS = 5.0
+
+def parse_time(text):
+    """'HH:MM' as minutes after midnight"""
+    try:
+        hours, minutes = (int(part) for part in text.split(':'))
+    except (AttributeError, ValueError):
+        raise ValueError(f"bad time {text!r}, expected HH:MM") from None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"bad time {text!r}, expected HH:MM")
+    return hours * 60 + minutes
+
+class Entry:
+    """One playlist entry: what to show, for how long and when"""
+
+    def __init__(self, pattern=None, params=None, seconds=None, between=None, days=None,
+                 brightness=None, off=False):
+        if pattern is None and not off:
+            raise ValueError("needs a pattern, or off: true")
+        self.pattern = None if off else pattern
+        self.params = params or {}
+        if not isinstance(self.params, dict):
+            raise TypeError(f"params must be an object, not {params!r}")
+        self.seconds = None if seconds is None else float(seconds)
+        if self.seconds is not None and self.seconds <= 0:
+            # Zero would ask the schedule for the next entry on every frame
+            raise ValueError(f"seconds must be positive, not {seconds!r}")
+        if between and len(between) != 2:
+            raise ValueError(f"between needs a start and an end time, not {between!r}")
+        self.window = tuple(parse_time(t) for t in between) if between else None
+        self.days = {DAYS.index(day.lower()[:3]) for day in days} if days else None
+        self.brightness = None if brightness is None else brightness_level(brightness)
+
+    def active(self, now):
+        """True if the entry may play at datetime now"""
+        if self.days is not None and now.weekday() not in self.days:
+            return False
+        if self.window is None:
+            return True
+        start, end = self.window
+        minute = now.hour * 60 + now.minute
+        if start <= end:
+            return start <= minute < end
+        # The window wraps past midnight
+        return minute >= start or minute < end
+
+    def __str__(self):
+        return self.pattern or 'off'
+
+class Schedule:
+    """A playlist file, re-read whenever it changes on disk"""
+
+    def __init__(self, path, registry):
+        self.path = path
+        self.registry = registry
+        self.mtime = None
+        self._position = -1
+        self.load()
+
+    def load(self):
+        """Read and validate the playlist; raises ValueError if it is unusable"""
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path) as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{self.path}: {e}") from None
+        if not isinstance(data, dict) or not isinstance(data.get('entries'), list):
+            raise ValueError(f"{self.path}: expected an object with an entries list")
+        entries = []
+        for number, item in enumerate(data['entries'], 1):
+            try:
+                entry = Entry(**{'seconds': data.get('seconds', 60.0), **item})
+                if entry.pattern is not None:
+                    # Catches unknown parameter names now rather than mid-show
+                    self.registry.get(entry.pattern).check(entry.params)
+            except (KeyError, TypeError, ValueError) as e:
+                message = e.args[0] if isinstance(e, KeyError) and e.args else e
+                raise ValueError(f"{self.path}: entry {number}: {message}") from None
+            entries.append(entry)
+        try:
+            float(data.get('fade', 1.0))
+            # Stored as the 0-255 level the backends take
+            brightness = data.get('brightness')
+            if brightness is not None:
+                brightness = brightness_level(brightness)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{self.path}: {e}") from None
+        if data.get('transition', 'crossfade') not in TRANSITIONS:
+            raise ValueError(f"{self.path}: unknown transition {data['transition']!r}")
+        self.data = data
+        self.entries = entries
+        self.brightness = brightness
+        self.mtime = mtime
+
+    def reload_if_changed(self):
+        """Re-read the playlist if its file changed; keeps the old one on errors"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self.mtime:
+                return False
+            self.load()
+        except (OSError, ValueError) as e:
+            print(f"Keeping the current playlist: {e}", file=sys.stderr)
+            if isinstance(e, ValueError):
+                # Complain once, not at every entry, until the file changes again
+                self.mtime = mtime
+            return False
+        self._position = -1
+        print(f"Reloaded {self.path}: {len(self.entries)} entries", file=sys.stderr)
+        return True
+
+    def next_entry(self, now):
+        """The entry to play after the current one, or None if nothing is due"""
+        windowed = [i for i, entry in enumerate(self.entries)
+                    if entry.window is not None and entry.active(now)]
+        candidates = windowed or [i for i, entry in enumerate(self.entries)
+                                  if entry.window is None and entry.active(now)]
+        if not candidates:
+            return None
+        # Round robin by playlist position
+        later = [i for i in candidates if i > self._position]
+        self._position = later[0] if later else candidates[0]
+        return self.entries[self._position]
+
+class Daemon:
+    """Plays a Schedule on a matrix through one long-lived Engine"""
+
+    def __init__(self, matrix, schedule, brightness=None, metrics=None, profile=DEFAULT_PROFILE):
+        self.matrix = matrix
+        self.schedule = schedule
+        # Used by entries that don't set their own brightness
+        self.brightness = matrix.LED_BRIGHTNESS if brightness is None else brightness_level(brightness)
+        self.current = None
+        # The display patterns plus 'schedule', so the control server can
+        # switch away and back again
+        self.registry = PatternRegistry()
+        self.registry.update(PATTERNS)
+        self.registry.register('schedule', fps=50)(self._play)
+        self.engine = Engine(matrix, self.registry, metrics=metrics,
+                             max_fps=safe_fps(matrix.backend, profile))
+
+    def _next_item(self, t):
+        # Called at entry boundaries only, so checking the file here is cheap
+        now = datetime.datetime.now()
+        self.schedule.reload_if_changed()
+        # Entries the strip refuses are skipped; give up on a full round of them
+        for _ in range(len(self.schedule.entries)):
+            entry = self.schedule.next_entry(now)
+            self.current = entry
+            if entry is None or self._apply_brightness(entry):
+                break
+        else:
+            entry = self.current = None
+        if entry is None:
+            return None, {}, IDLE_SECONDS
+        print(f"{now:%H:%M:%S} {entry}", file=sys.stderr)
+        if entry.pattern is None:
+            return None, {}, entry.seconds or IDLE_SECONDS
+        return self.schedule.registry.get(entry.pattern), entry.params, entry.seconds
+
+    def _apply_brightness(self, entry):
+        """Set the entry's brightness; False (and logged) if the strip rejects it"""
+        brightness = entry.brightness
+        if brightness is None:
+            brightness = self.brightness if self.schedule.brightness is None else self.schedule.brightness
+        if brightness == self.matrix.LED_BRIGHTNESS:
+            return True
+        try:
+            self.matrix.set_brightness(brightness)
+        except Exception as e:
+            print(f"Skipping {entry}: brightness {brightness} failed: {e!r}", file=sys.stderr)
+            return False
+        return True
+
+    def _play(self, canvas):
+        """Pattern generator following the schedule forever"""
+        data = self.schedule.data
+        yield from sequence(canvas, self._next_item, data.get('transition', 'crossfade'),
+                            float(data.get('fade', 1.0)))
+
+    def run(self):
+        return self.engine.run('schedule')
+
+def main():
+    parser = argparse.ArgumentParser(description='Play a scheduled playlist on the matrix')
+    parser.add_argument('playlist', help='Playlist JSON file')
+    parser.add_argument('--pin', type=int, default=18, help='GPIO pin number')
+    parser.add_argument('--brightness', type=int, default=50, help='Brightness (0-255)')
+    parser.add_argument('--gamma', type=float, default=None,
+                        help='Gamma correction, e.g. 2.8 (default: none)')
+    parser.add_argument('--threaded', action='store_true',
+                        help='Push frames from a separate output thread')
+    parser.add_argument('--backend', default='ws281x', choices=['ws281x', 'null'],
+                        help='Output backend (null renders without hardware)')
+    add_mapping_arguments(parser)
+    add_control_arguments(parser)
+    add_power_arguments(parser)
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    # Check the playlist before touching the hardware
+    try:
+        schedule = Schedule(args.playlist, PATTERNS)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.backend == 'ws281x':
+        require_root('matrix_daemon.py')
+
+    mapping = mapping_from_args(args)
+    backend = NullBackend(mapping.count) if args.backend == 'null' else None
+    matrix = NeoMatrix(pin=args.pin, brightness=args.brightness, mapping=mapping, backend=backend,
+                       gamma=args.gamma, threaded=args.threaded,
+                       power=power_from_args(args, mapping.count))
+    metrics = metrics_from_args(args)
+    daemon = Daemon(matrix, schedule, metrics=metrics, profile=args.profile)
+    control = server_from_args(daemon.engine, args)
+    print(f"Playing {args.playlist} ({len(schedule.entries)} entries). Press Ctrl+C to exit")
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        matrix.clear()
+        matrix.show()
+    finally:
+        if control:
+            control.close()
+        if metrics:
+            metrics.close()
+        matrix.close()
+
+if __name__ == "__main__":
+    main()
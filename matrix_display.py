@@ -1,122 +1,214 @@
 #!/usr/bin/env python3
-import time
-import sys
 import argparse
-from rpi_ws281x import PixelStrip, Color
+import numpy as np
+from matrix_anim import cached_animation, play as play_animation
+from matrix_audio import spectrum, vu
+from matrix_backends import (WS281xBackend, NullBackend, MultiBackend, brightness_level,
+                             channel_for_pin, peripheral_for_pin, require_root)
+from matrix_calibrate import add_profile_arguments, safe_fps
+from matrix_control import add_control_arguments, server_from_args
+from matrix_color import Color, WHEEL, color_to_rgb, gamma_lut, apply_lut
+from matrix_engine import Canvas, Engine, PatternRegistry, frames
+from matrix_gfx import BLEND_MODES, LayerStack, Sprite, blit, hline, vline
+from matrix_life import RULES, life
+from matrix_pipeline import OutputThread
+from matrix_power import add_power_arguments, power_from_args
+from matrix_shader import plasma, rainbow, tunnel, waves
+from matrix_transitions import TRANSITIONS, playlist as play_list
+from matrix_text import FONT_5X7, load_font, scroll_text
+from matrix_mapping import get_mapping, add_mapping_arguments, mapping_from_args
+from matrix_metrics import add_metrics_arguments, metrics_from_args
+from matrix_particles import balls, fireworks, rain
 
 # Matrix configuration
-class NeoMatrix:
-    def __init__(self, width=16, height=16, pin=18, brightness=50, channel=0):
-        self.WIDTH = width
-        self.HEIGHT = height
-        self.NUM_PIXELS = width * height
+class NeoMatrix(Canvas):
+    def __init__(self, width=16, height=16, pin=18, brightness=50, channel=0, mapping=None,
+                 backend=None, gamma=None, threaded=False, power=None):
+        # Wiring lookup tables and framebuffer; the default is a single zigzag panel
+        super().__init__(mapping or get_mapping(width, height))
         
         # LED strip configuration
         self.LED_PIN = pin
         self.LED_FREQ_HZ = 800000
         self.LED_DMA = 10
-        self.LED_BRIGHTNESS = brightness
+        # 0-255 level; a 0.0-1.0 float is converted
+        self.LED_BRIGHTNESS = brightness_level(brightness)
         self.LED_INVERT = False
         self.LED_CHANNEL = channel
         
-        # Create and initialize the NeoPixel strip
-        self.strip = PixelStrip(
-            self.NUM_PIXELS, 
-            self.LED_PIN, 
-            self.LED_FREQ_HZ, 
-            self.LED_DMA, 
-            self.LED_INVERT, 
+        # LED-ordered copy of the frame handed to the backend, allocated once
+        self._leds = np.empty((self.NUM_PIXELS, 3), dtype=np.uint8)
+        
+        # Last frame actually transmitted, so unchanged frames can be skipped
+        self._sent = np.zeros_like(self.frame)
+        self._sent_valid = False
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        
+        # Optional gamma correction, applied to the whole frame on show()
+        self.gamma_lut = gamma_lut(gamma) if gamma and gamma != 1.0 else None
+        
+        # Output: the ws281x strip unless another backend is given
+        self.backend = backend or WS281xBackend(
+            self.NUM_PIXELS,
+            self.LED_PIN,
             self.LED_BRIGHTNESS,
-            self.LED_CHANNEL
+            self.LED_CHANNEL,
+            self.LED_FREQ_HZ,
+            self.LED_DMA,
+            self.LED_INVERT
         )
-        self.strip.begin()
+        self.backend.begin()
         
-    def xy_to_index(self, x, y):
-        """Convert x,y coordinates to LED index, zigzag pattern"""
-        if y % 2 == 0:
-            # Even rows go left to right
-            return y * self.WIDTH + x
-        else:
-            # Odd rows go right to left
-            return y * self.WIDTH + (self.WIDTH - 1 - x)
-    
-    def fill(self, color):
-        """Fill the entire matrix with one color"""
-        for i in range(self.NUM_PIXELS):
-            self.strip.setPixelColor(i, color)
-        self.strip.show()
+        # Optional current limiter, applied after gamma on every transmitted frame
+        self.power = power
+        if power:
+            power.brightness = self.LED_BRIGHTNESS / 255.0
+        
+        # Optionally push frames from a dedicated thread while the next renders
+        self.output = OutputThread(self.backend) if threaded else None
+        
+    def dirty(self):
+        """True if the framebuffer differs from the last transmitted frame"""
+        return not (self._sent_valid and np.array_equal(self.frame, self._sent))
     
-    def clear(self):
-        """Clear the matrix (turn off all pixels)"""
-        self.fill(Color(0, 0, 0))
+    def show(self, force=False):
+        """Remap the framebuffer to strip order and push it in one bulk write
+        
+        Does nothing (and returns False) if no pixel changed since the last
+        transmitted frame, unless force is set.
+        """
+        changed = self.dirty()
+        # An unchanged frame still goes out while the power limiter eases back up
+        if not force and not changed and (self.power is None or self.power.settled):
+            self.frames_skipped += 1
+            return False
+        np.copyto(self._sent, self.frame)
+        self._sent_valid = True
+        self.frames_sent += 1
+        
+        # Render into the output thread's back buffer, or our own
+        leds = self.output.acquire() if self.output else self._leds
+        
+        # Wiring remap: one gather through the precomputed permutation
+        self.mapping.to_leds(self.frame, out=leds)
+        if self.gamma_lut is not None:
+            apply_lut(leds, self.gamma_lut, out=leds)
+        if self.power:
+            self.power.limit(leds, total=None if changed or force else self.power.total)
+        
+        if self.output:
+            self.output.publish(leds)
+        else:
+            self.backend.show(leds)
+        return True
 
-    def set_pixel(self, x, y, color):
-        """Set a single pixel by x,y coordinates"""
-        if 0 <= x < self.WIDTH and 0 <= y < self.HEIGHT:
-            self.strip.setPixelColor(self.xy_to_index(x, y), color)
-    
-    def show(self):
-        """Update the display with current pixel values"""
-        self.strip.show()
+    def show_leds(self, leds, corrected=False):
+        """Push already LED-ordered (N, 3) data, bypassing the framebuffer
+        
+        Used for pre-rendered frames: without gamma or an output thread the
+        data goes to the backend as-is, with no remap or copy. Set corrected
+        if the data already has this matrix's gamma applied.
+        """
+        # The framebuffer no longer describes what the LEDs show
+        self._sent_valid = False
+        self.frames_sent += 1
+        gamma = None if corrected else self.gamma_lut
+        if gamma is None and not self.output and not self.power:
+            self.backend.show(leds)
+            return
+        out = self.output.acquire() if self.output else self._leds
+        if gamma is not None:
+            apply_lut(leds, gamma, out=out)
+            leds = out
+        if self.power:
+            self.power.limit(leds, out=out)
+        elif leds is not out:
+            np.copyto(out, leds)
+        if self.output:
+            self.output.publish(out)
+        else:
+            self.backend.show(out)
+
+    def set_brightness(self, brightness):
+        """Change the output brightness without restarting the strip
+
+        Takes a 0-255 level or a 0.0-1.0 float; LED_BRIGHTNESS holds the
+        level once the backend has accepted it.
+        """
+        level = brightness_level(brightness)
+        self.backend.set_brightness(level)
+        self.LED_BRIGHTNESS = level
+        if self.power:
+            self.power.brightness = level / 255.0
+        # The same pixels now look different, so the next frame must go out
+        self._sent_valid = False
+
+    def close(self):
+        """Finish any queued output and release the backend"""
+        if self.output:
+            self.output.close()
+            self.output = None
+        self.backend.close()
 
     def wheel(self, pos):
         """Generate rainbow colors across 0-255 positions."""
-        if pos < 85:
-            return Color(pos * 3, 255 - pos * 3, 0)
-        elif pos < 170:
-            pos -= 85
-            return Color(255 - pos * 3, 0, pos * 3)
-        else:
-            pos -= 170
-            return Color(0, pos * 3, 255 - pos * 3)
+        return Color(*WHEEL[pos & 255].tolist())
 
 # Display patterns
-def color_wipe(matrix, color, wait_ms=50):
+# Each pattern is a generator that draws into a canvas and yields one frame
+# per step; the engine owns pacing and show().
+PATTERNS = PatternRegistry()
+
+def color_wipe(canvas, color):
     """Wipe color across display a pixel at a time."""
-    for i in range(matrix.NUM_PIXELS):
-        matrix.strip.setPixelColor(i, color)
-        matrix.strip.show()
-        time.sleep(wait_ms/1000.0)
+    rgb = color_to_rgb(color)
+    for i in range(canvas.NUM_PIXELS):
+        x, y = canvas.index_to_xy(i)
+        canvas.frame[y, x] = rgb
+        yield canvas.frame
 
-def rainbow_cycle(matrix, wait_ms=20, iterations=1):
+@PATTERNS.register('rainbow', fps=50)
+def rainbow_cycle(canvas, iterations=1):
     """Draw rainbow that uniformly distributes itself across all pixels."""
-    for j in range(256*iterations):
-        for i in range(matrix.NUM_PIXELS):
-            matrix.strip.setPixelColor(i, matrix.wheel((i + j) & 255))
-        matrix.strip.show()
-        time.sleep(wait_ms/1000.0)
+    # One wheel position per frame at the pattern's 50 fps
+    yield from rainbow(canvas, duration=256 * iterations / 50)
+
+@PATTERNS.register('wipe', fps=20)
+def wipe(canvas, colors=(Color(255, 0, 0), Color(0, 255, 0), Color(0, 0, 255), Color(0, 0, 0))):
+    """Color wipe through each color in turn (red, green, blue, off)."""
+    for color in colors:
+        yield from color_wipe(canvas, color)
 
-def crosshair(matrix, color, wait_ms=200, iterations=10):
+@PATTERNS.register('crosshair', fps=5, color=Color(255, 255, 0))
+def crosshair(canvas, color, iterations=10):
     """Moving crosshair pattern."""
+    rgb = color_to_rgb(color)
     for _ in range(iterations):
-        for x in range(matrix.WIDTH):
+        for x in range(canvas.WIDTH):
             # Clear previous pixels
-            matrix.clear()
+            canvas.clear()
             
-            # Draw horizontal line
-            for i in range(matrix.WIDTH):
-                matrix.set_pixel(i, x, color)
-                
-            # Draw vertical line
-            for i in range(matrix.HEIGHT):
-                matrix.set_pixel(x, i, color)
+            # Horizontal and vertical line through (x, x)
+            hline(canvas.frame, 0, canvas.WIDTH - 1, x, rgb)
+            vline(canvas.frame, x, 0, canvas.HEIGHT - 1, rgb)
                 
-            matrix.show()
-            time.sleep(wait_ms/1000.0)
+            yield canvas.frame
 
-def spiral(matrix, wait_ms=50):
+@PATTERNS.register('spiral', fps=20)
+def spiral(canvas, hold_frames=10):
     """Draw a spiral pattern inward and outward."""
     # Create a spiral path
     path = []
-    x, y = matrix.WIDTH // 2, matrix.HEIGHT // 2
+    x, y = canvas.WIDTH // 2, canvas.HEIGHT // 2
     dx, dy = 1, 0
     
     steps = 1
     step_count = 0
-    max_steps = max(matrix.WIDTH, matrix.HEIGHT) * 2
+    max_steps = max(canvas.WIDTH, canvas.HEIGHT) * 2
     
-    for _ in range(matrix.NUM_PIXELS):
-        if 0 <= x < matrix.WIDTH and 0 <= y < matrix.HEIGHT:
+    for _ in range(canvas.NUM_PIXELS):
+        if 0 <= x < canvas.WIDTH and 0 <= y < canvas.HEIGHT:
             path.append((x, y))
         
         # Move to next position
@@ -133,161 +225,285 @@ def spiral(matrix, wait_ms=50):
             break
     
     # Spiral inward - light up pixels along the path
-    matrix.clear()
+    canvas.clear()
     for i, (x, y) in enumerate(path):
-        color = matrix.wheel((i * 4) % 255)
-        matrix.set_pixel(x, y, color)
-        matrix.show()
-        time.sleep(wait_ms / 1000.0)
+        canvas.frame[y, x] = WHEEL[(i * 4) % 255]
+        yield canvas.frame
     
-    time.sleep(0.5)
+    # Hold the finished spiral
+    for _ in range(hold_frames):
+        yield canvas.frame
     
-    # Spiral outward - turn off pixels along the path
-    for x, y in reversed(path):
-        matrix.set_pixel(x, y, Color(0, 0, 0))
-        matrix.show()
-        time.sleep(wait_ms / 2000.0)
+    # Spiral outward at double speed - turn off two pixels per frame
+    for i, (x, y) in enumerate(reversed(path)):
+        canvas.frame[y, x] = 0
+        if i % 2 == 1:
+            yield canvas.frame
+    yield canvas.frame
 
-def bounce(matrix, color, iterations=10, wait_ms=50):
+@PATTERNS.register('bounce', fps=20, color=Color(0, 0, 255), iterations=30)
+def bounce(canvas, color, iterations=10):
     """Bounce a pixel/ball around the matrix."""
+    ball = Sprite.solid(1, 1, color)
     x, y = 0, 0
     dx, dy = 1, 1
     
     for _ in range(iterations):
         # Clear previous position
-        matrix.clear()
+        canvas.clear()
         
-        # Draw pixel at current position
-        matrix.set_pixel(x, y, color)
-        matrix.show()
+        # Draw the ball at its current position
+        blit(canvas.frame, ball, x, y)
+        yield canvas.frame
         
         # Update position
         x += dx
         y += dy
         
         # Bounce off edges
-        if x >= matrix.WIDTH - 1 or x <= 0:
+        if x >= canvas.WIDTH - 1 or x <= 0:
             dx = -dx
-        if y >= matrix.HEIGHT - 1 or y <= 0:
+        if y >= canvas.HEIGHT - 1 or y <= 0:
             dy = -dy
-            
-        time.sleep(wait_ms / 1000.0)
 
-def display_text(matrix, text, color=Color(255, 255, 255), speed=0.1):
-    """Display scrolling text using a simplified font."""
-    # Simple 5x7 font (very basic implementation)
-    # This will be highly simplified for demonstration purposes
-    # In practice, you'd want a more complete font system
-    
-    # Clear the matrix
-    matrix.clear()
-    
-    # Display the text "Hi!" as an example
-    # H pattern
-    x_offset = 0
-    
-    for x_offset in range(matrix.WIDTH, -20, -1):
-        matrix.clear()
-        
-        # Draw a simple 'HI!' using simple patterns
-        # H letter
-        for i in range(7):
-            matrix.set_pixel(x_offset, i, color)  # Left vertical
-            matrix.set_pixel(x_offset + 4, i, color)  # Right vertical
-            
-        for i in range(5):
-            if i == 2:  # Middle horizontal
-                matrix.set_pixel(x_offset + i, 3, color)
-        
-        # I letter
-        for i in range(7):
-            matrix.set_pixel(x_offset + 6, i, color)  # Middle vertical
-            
-        # ! mark
-        for i in range(5):
-            matrix.set_pixel(x_offset + 8, i, color)  # Top vertical
-        matrix.set_pixel(x_offset + 8, 6, color)  # Bottom dot
-        
-        matrix.show()
-        time.sleep(speed)
+@PATTERNS.register('text', fps=10, text="HI!")
+def display_text(canvas, text, color=Color(255, 255, 255), font=None):
+    """Display scrolling text using a 5x7 bitmap font (or a BDF font file)."""
+    yield from scroll_text(canvas, text, color, load_font(font) if font else FONT_5X7)
+
+@PATTERNS.register('overlay', fps=10, text="HI!")
+def overlay(canvas, text, color=Color(255, 255, 255), base='rainbow', mode='over',
+            opacity=1.0, font=None):
+    """Scrolling text composited over another pattern (which loops underneath)."""
+    if base == 'overlay':
+        raise ValueError("overlay cannot be its own base pattern")
+    base_spec = PATTERNS.get(base)
+    stack = LayerStack(canvas.WIDTH, canvas.HEIGHT)
+    below = stack.add()
+    above = stack.add(mode, opacity, key_black=True)
+    base_frames = None
+    for text_frame in display_text(Canvas(canvas.mapping), text, color, font):
+        base_frame = next(base_frames, None) if base_frames else None
+        if base_frame is None:
+            # (Re)start the base pattern whenever it runs out
+            base_frames = frames(base_spec, Canvas(canvas.mapping))
+            base_frame = next(base_frames, below.frame)
+        # Layers just point at the patterns' framebuffers: no copies
+        below.frame = base_frame
+        above.frame = text_frame
+        yield stack.composite(canvas.frame)
+
+@PATTERNS.register('life', fps=15, generations=300)
+def game_of_life(canvas, rule='life', generations=None, density=0.35):
+    """Conway's Life (or another B/S rule) colored by cell age, reseeding when it settles."""
+    yield from life(canvas, rule, density, generations)
+
+PATTERNS.register('plasma', fps=50)(plasma)
+PATTERNS.register('waves', fps=50)(waves)
+PATTERNS.register('tunnel', fps=50)(tunnel)
+
+@PATTERNS.register('fireworks', fps=30)
+def particle_fireworks(canvas, iterations=400):
+    """Rockets bursting into falling sparks."""
+    yield from fireworks(canvas, iterations, fps=30)
+
+@PATTERNS.register('rain', fps=30)
+def particle_rain(canvas, iterations=400):
+    """Falling raindrops with streaks."""
+    yield from rain(canvas, iterations, fps=30)
+
+@PATTERNS.register('balls', fps=30)
+def particle_balls(canvas, count=12, iterations=400):
+    """Many bouncing balls with fading trails."""
+    yield from balls(canvas, count, iterations, fps=30)
+
+@PATTERNS.register('spectrum', fps=50)
+def audio_spectrum(canvas, source='alsa'):
+    """Spectrum analyser bars for live audio or a WAV file, one band per column."""
+    yield from spectrum(canvas, source)
+
+@PATTERNS.register('vu', fps=50)
+def audio_vu(canvas, source='alsa'):
+    """Audio level meter for live audio or a WAV file."""
+    yield from vu(canvas, source)
+
+# Patterns that need an audio source are left out of the all/playlist rotation
+AUDIO_PATTERNS = ('spectrum', 'vu')
+
+@PATTERNS.register('playlist', fps=50)
+def playlist(canvas, patterns=None, transition='crossfade', fade=1.0, seconds=None, repeat=True,
+             params=None, announce=None):
+    """Every other pattern in turn, each blended into the next."""
+    names = patterns or [name for name in PATTERNS.names()
+                         if name != 'playlist' and name not in AUDIO_PATTERNS]
+    yield from play_list(canvas, PATTERNS, names, params, seconds, transition, fade, repeat, announce)
+
+def chain_backend(parser, args, mapping):
+    """Build a MultiBackend from --chain PIN:TILES[:DMA] options"""
+    panel = mapping.panel_width * mapping.panel_height
+    backends = []
+    used = {}
+    for i, chain in enumerate(args.chain):
+        try:
+            pin, tiles, *dma = (int(field) for field in chain.split(':'))
+        except ValueError:
+            parser.error(f"bad --chain {chain!r}, expected PIN:TILES[:DMA]")
+        try:
+            peripheral = peripheral_for_pin(pin)
+        except ValueError as e:
+            parser.error(str(e))
+        if peripheral in used:
+            # Includes PWM channels 0 and 1: both belong to one peripheral
+            parser.error(f"--chain pins {used[peripheral]} and {pin} both use {peripheral}; "
+                         f"each chain needs its own of PWM, PCM and SPI")
+        used[peripheral] = pin
+        if args.backend == 'null':
+            backends.append(NullBackend(tiles * panel))
+        else:
+            # Every chain needs its own DMA channel
+            backends.append(WS281xBackend(tiles * panel, pin, args.brightness, channel_for_pin(pin),
+                                          dma=dma[0] if dma else 10 + i))
+    if sum(backend.count for backend in backends) != mapping.count:
+        parser.error(f"--chain tiles must add up to {mapping.tiles_x * mapping.tiles_y}")
+    return MultiBackend(backends)
 
 def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Control a 16x16 NeoPixel Matrix')
     parser.add_argument('--pin', type=int, default=18, help='GPIO pin number')
     parser.add_argument('--brightness', type=int, default=50, help='Brightness (0-255)')
+    parser.add_argument('--gamma', type=float, default=None,
+                      help='Gamma correction, e.g. 2.8 (default: none)')
+    parser.add_argument('--cache', action='store_true',
+                      help='Render the pattern once to a cached animation file and play that')
+    parser.add_argument('--threaded', action='store_true',
+                      help='Push frames from a separate output thread')
+    parser.add_argument('--backend', default='ws281x', choices=['ws281x', 'null'],
+                      help='Output backend (null renders without hardware)')
+    add_mapping_arguments(parser)
+    parser.add_argument('--chain', action='append', default=None, metavar='PIN:TILES[:DMA]',
+                      help='Drive the next TILES panels from another pin; repeat once per chain')
     parser.add_argument('--pattern', type=str, default='all',
-                      choices=['rainbow', 'wipe', 'crosshair', 'spiral', 'bounce', 'text', 'all'],
+                      choices=PATTERNS.names() + ['all'],
                       help='Pattern to display')
+    parser.add_argument('--fps', type=float, default=None,
+                      help='Frame rate (default: each pattern\'s own rate)')
+    parser.add_argument('--text', default='HI!', help='Text for the text pattern')
+    parser.add_argument('--font', default=None, help='BDF font file for the text pattern')
+    parser.add_argument('--rule', default='life',
+                      help=f"Life rule in B/S notation, or one of {', '.join(RULES)}")
+    parser.add_argument('--blend', default='over', choices=BLEND_MODES,
+                      help='How the overlay pattern draws its text over the base pattern')
+    parser.add_argument('--transition', default='crossfade', choices=list(TRANSITIONS),
+                      help='How the all/playlist modes move from one pattern to the next')
+    parser.add_argument('--fade', type=float, default=1.0,
+                      help='Transition length in seconds')
+    parser.add_argument('--seconds', type=float, default=None,
+                      help='Play each pattern for this long in all/playlist modes (default: its own length)')
+    parser.add_argument('--image', nargs='+', default=None, metavar='PATH',
+                      help='Play image/GIF files (or directories of them) instead of patterns')
+    parser.add_argument('--fit', default='contain', choices=['contain', 'cover', 'stretch'],
+                      help='How images are scaled to the panel')
+    parser.add_argument('--hold', type=float, default=5.0,
+                      help='Seconds to show each still image')
+    parser.add_argument('--audio', default='alsa', metavar='SOURCE',
+                      help="Audio for the spectrum/vu patterns: a WAV file, '-' for raw 16-bit "
+                           "mono PCM on stdin, or alsa[:DEVICE] (default: alsa)")
+    parser.add_argument('--receive', default=None, choices=['ddp', 'e131', 'raw'],
+                      help='Show frames streamed over UDP instead of running patterns')
+    parser.add_argument('--port', type=int, default=None,
+                      help='UDP port for --receive (default per protocol)')
+    add_control_arguments(parser)
+    add_power_arguments(parser)
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    if args.cache and args.pattern in AUDIO_PATTERNS:
+        parser.error(f"--cache can't record {args.pattern}: it follows live audio")
+    
+    # Only the ws281x hardware needs root
+    if args.backend == 'ws281x':
+        require_root('matrix_display.py')
     
     # Initialize matrix
-    matrix = NeoMatrix(pin=args.pin, brightness=args.brightness)
+    mapping = mapping_from_args(args)
+    if args.chain:
+        backend = chain_backend(parser, args, mapping)
+    else:
+        backend = NullBackend(mapping.count) if args.backend == 'null' else None
+    matrix = NeoMatrix(pin=args.pin, brightness=args.brightness, mapping=mapping, backend=backend,
+                       gamma=args.gamma, threaded=args.threaded,
+                       power=power_from_args(args, mapping.count))
+    metrics = metrics_from_args(args)
+    if metrics and matrix.power:
+        metrics.gauge('estimated_milliamps', 'Estimated current draw', lambda: matrix.power.estimated_ma)
+    max_fps = safe_fps(matrix.backend, args.profile)
+    if max_fps:
+        print(f"Frame rate limited to {max_fps} fps by the hardware profile")
+    engine = Engine(matrix, PATTERNS, fps=args.fps, metrics=metrics, max_fps=max_fps)
+    params = {'text': {'text': args.text, 'font': args.font},
+              'overlay': {'text': args.text, 'font': args.font, 'mode': args.blend},
+              'life': {'rule': args.rule},
+              'spectrum': {'source': args.audio}, 'vu': {'source': args.audio}}
+    params['playlist'] = {'transition': args.transition, 'fade': args.fade,
+                          'seconds': args.seconds, 'params': dict(params)}
+    control = server_from_args(engine, args)
     
     try:
         print(f"NeoPixel Matrix Demo - Pin: {args.pin}, Brightness: {args.brightness}")
         print("Press Ctrl+C to exit")
         
-        if args.pattern == 'rainbow' or args.pattern == 'all':
-            print("Rainbow cycle pattern")
-            rainbow_cycle(matrix)
-            matrix.clear()
-            
-        if args.pattern == 'wipe' or args.pattern == 'all':
-            print("Color wipe pattern")
-            color_wipe(matrix, Color(255, 0, 0))  # Red
-            color_wipe(matrix, Color(0, 255, 0))  # Green
-            color_wipe(matrix, Color(0, 0, 255))  # Blue
-            color_wipe(matrix, Color(0, 0, 0))    # Off
-            
-        if args.pattern == 'crosshair' or args.pattern == 'all':
-            print("Crosshair pattern")
-            crosshair(matrix, Color(255, 255, 0))
-            matrix.clear()
-            
-        if args.pattern == 'spiral' or args.pattern == 'all':
-            print("Spiral pattern")
-            spiral(matrix)
-            matrix.clear()
-            
-        if args.pattern == 'bounce' or args.pattern == 'all':
-            print("Bounce pattern")
-            bounce(matrix, Color(0, 0, 255), iterations=30)
-            matrix.clear()
-            
-        if args.pattern == 'text' or args.pattern == 'all':
-            print("Text scrolling")
-            display_text(matrix, "HI!")
+        if args.image:
+            from matrix_image import play_files
+            print(f"Playing {len(args.image)} image path(s)")
+            play_files(matrix, args.image, hold=args.hold, fit=args.fit)
+        elif args.receive:
+            # A remote renderer supplies the frames
+            from matrix_receiver import FrameReceiver
+            receiver = FrameReceiver(matrix, args.receive, args.port)
+            print(f"Receiving {args.receive} frames on port {receiver.address[1]}")
+            try:
+                receiver.serve_forever()
+            finally:
+                receiver.close()
+        elif args.pattern == 'all':
+            # Play every registered pattern once, in order, blending from one to the next
+            clock = engine.run('playlist', loop=False, transition=args.transition, fade=args.fade,
+                               seconds=args.seconds, repeat=False, params=params,
+                               announce=lambda name: print(f"{name.capitalize()} pattern"))
+            print(f"  {clock.summary()}")
             matrix.clear()
-            
-        # If a specific pattern was chosen, run it continuously
-        if args.pattern != 'all':
+            matrix.show()
+        else:
+            # A specific pattern runs continuously
             print(f"Running {args.pattern} pattern continuously. Press Ctrl+C to exit.")
-            while True:
-                if args.pattern == 'rainbow':
-                    rainbow_cycle(matrix)
-                elif args.pattern == 'wipe':
-                    color_wipe(matrix, Color(255, 0, 0))
-                    color_wipe(matrix, Color(0, 255, 0))
-                    color_wipe(matrix, Color(0, 0, 255))
-                    color_wipe(matrix, Color(0, 0, 0))
-                elif args.pattern == 'crosshair':
-                    crosshair(matrix, Color(255, 255, 0))
-                elif args.pattern == 'spiral':
-                    spiral(matrix)
-                elif args.pattern == 'bounce':
-                    bounce(matrix, Color(0, 0, 255), iterations=30)
-                elif args.pattern == 'text':
-                    display_text(matrix, "HI!")
+            if args.cache:
+                # Deterministic patterns only need rendering once; like the
+                # engine, render at the hardware profile's rate if that is lower
+                spec = PATTERNS.get(args.pattern)
+                fps = args.fps or spec.fps
+                if max_fps:
+                    fps = min(fps, max_fps)
+                animation = cached_animation(spec, mapping, fps=fps, **params.get(args.pattern, {}))
+                play_animation(matrix, animation, loops=None)
+            else:
+                engine.run(args.pattern, **params.get(args.pattern, {}))
         
     except KeyboardInterrupt:
         print("Exiting...")
         matrix.clear()
+        matrix.show()
+    finally:
+        if control:
+            control.close()
+        if metrics:
+            metrics.close()
+        print(f"Frames sent: {matrix.frames_sent}, skipped unchanged: {matrix.frames_skipped}")
+        if matrix.power:
+            power = matrix.power
+            print(f"Power: peak estimate {power.peak_ma:.0f} mA, "
+                  f"{power.limited_frames} frames limited to {power.budget_ma:g} mA")
+        matrix.close()
 
 if __name__ == "__main__":
-    if not sys.argv[0].startswith('sudo'):
-        print("This script must be run with sudo privileges.")
-        print("Usage: sudo python3 matrix_display.py [--pin PIN] [--brightness BRIGHTNESS] [--pattern PATTERN]")
-        sys.exit(1)
-        
     main()
\ No newline at end of file
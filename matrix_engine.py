@@ -0,0 +1,285 @@
+"""Pattern registry and the render loop that plays registered patterns.
+
+A pattern is a generator function taking a Canvas plus keyword parameters.
+Each step draws one frame and yields it as an (H, W, 3) uint8 array; the
+value sent back in is the pattern time in seconds (frame number / fps), so
+``t = yield canvas.frame`` gives time-driven patterns their clock.
+"""
+import collections
+import inspect
+import sys
+import threading
+import time
+import numpy as np
+from matrix_clock import FrameClock
+from matrix_color import color_to_rgb
+from matrix_mapping import get_mapping
+
+class Canvas:
+    """An off-screen (H, W, 3) frame with the matrix's drawing helpers"""
+
+    def __init__(self, mapping=None):
+        self.mapping = mapping or get_mapping()
+        self.WIDTH = self.mapping.width
+        self.HEIGHT = self.mapping.height
+        self.NUM_PIXELS = self.mapping.count
+        # Framebuffer patterns draw into, indexed [y, x] -> (r, g, b)
+        self.frame = np.zeros((self.HEIGHT, self.WIDTH, 3), dtype=np.uint8)
+
+    def xy_to_index(self, x, y):
+        """Convert x,y coordinates to LED index"""
+        return self.mapping.xy_to_index(x, y)
+
+    def index_to_xy(self, index):
+        """Convert LED index to x,y coordinates"""
+        return self.mapping.index_to_xy(index)
+
+    def set_pixel(self, x, y, color):
+        """Set a single pixel by x,y coordinates"""
+        if 0 <= x < self.WIDTH and 0 <= y < self.HEIGHT:
+            self.frame[y, x] = color_to_rgb(color)
+
+    def set_led(self, index, color):
+        """Set a single pixel by its position along the LED chain"""
+        x, y = self.mapping.index_to_xy(index)
+        self.frame[y, x] = color_to_rgb(color)
+
+    def fill(self, color):
+        """Fill the entire canvas with one color"""
+        self.frame[:] = color_to_rgb(color)
+
+    def clear(self):
+        """Turn off all pixels"""
+        self.frame[:] = 0
+
+class PatternSpec:
+    """A registered pattern: its generator function, frame rate and defaults"""
+
+    def __init__(self, name, func, fps, defaults):
+        self.name = name
+        self.func = func
+        self.fps = fps
+        self.defaults = defaults
+
+    def __call__(self, canvas, **params):
+        """Start the pattern on a canvas, returning its frame generator"""
+        return self.func(canvas, **{**self.defaults, **params})
+
+    def check(self, params):
+        """Raise TypeError unless the pattern accepts these keyword parameters"""
+        try:
+            inspect.signature(self.func).bind(None, **{**self.defaults, **params})
+        except TypeError as e:
+            raise TypeError(f"pattern {self.name!r}: {e}") from None
+
+class PatternRegistry:
+    """Named patterns, in registration order"""
+
+    def __init__(self):
+        self._patterns = {}
+
+    def register(self, name, fps=50, **defaults):
+        """Decorator registering a pattern generator under name"""
+        def decorator(func):
+            self._patterns[name] = PatternSpec(name, func, fps, defaults)
+            return func
+        return decorator
+
+    def update(self, other):
+        """Add every pattern from another registry"""
+        for spec in other:
+            self._patterns[spec.name] = spec
+
+    def get(self, name):
+        """Look up a pattern, raising KeyError with the known names"""
+        try:
+            return self._patterns[name]
+        except KeyError:
+            raise KeyError(f"unknown pattern {name!r}, expected one of {self.names()}") from None
+
+    def names(self):
+        return list(self._patterns)
+
+    def __contains__(self, name):
+        return name in self._patterns
+
+    def __iter__(self):
+        return iter(self._patterns.values())
+
+def frames(spec, canvas, fps=None, **params):
+    """Iterate a pattern's frames, sending each step its pattern time"""
+    fps = fps or spec.fps
+    generator = spec(canvas, **params)
+    try:
+        frame = next(generator)
+        count = 0
+        while True:
+            yield frame
+            count += 1
+            frame = generator.send(count / fps)
+    except StopIteration:
+        return
+
+def prerender(spec, mapping=None, limit=None, **params):
+    """Render a pattern headless into a (frames, H, W, 3) array"""
+    canvas = Canvas(mapping)
+    rendered = []
+    for frame in frames(spec, canvas, **params):
+        rendered.append(frame.copy())
+        if limit is not None and len(rendered) >= limit:
+            break
+    return np.array(rendered, dtype=np.uint8).reshape(-1, canvas.HEIGHT, canvas.WIDTH, 3)
+
+class Engine:
+    """Plays registered patterns on a matrix from a single render loop.
+
+    The matrix is anything with a ``frame`` array, a ``mapping`` and a
+    ``show()`` method. switch(), update() and defer() may be called from any
+    thread; changes are picked up at the next frame boundary, without
+    touching the strip. Pass a FrameMetrics to record per-frame timings.
+    """
+
+    def __init__(self, matrix, registry, fps=None, metrics=None, max_fps=None):
+        self.matrix = matrix
+        self.registry = registry
+        # Fixed frame rate for every pattern, or None for each pattern's own
+        self.fps = fps
+        # Ceiling from the hardware profile: the fastest the strip keeps up with
+        self.max_fps = max_fps
+        self.clock = FrameClock(fps or 50)
+        self.metrics = metrics
+        self.current = None
+        self._frames = None
+        self._produced = 0
+        self._pending = None
+        self._params = {}
+        # The last pattern that got as far as a frame, to go back to if the next one fails
+        self._fallback = None
+        self.error = None
+        # Calls queued by other threads, run between frames
+        self._actions = collections.deque()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def switch(self, name, **params):
+        """Change pattern at the next frame boundary"""
+        spec = self.registry.get(name)
+        spec.check(params)
+        with self._lock:
+            self._pending = (spec, params)
+
+    def update(self, **params):
+        """Change the current pattern's parameters at the next frame boundary"""
+        with self._lock:
+            spec, current = self._pending or (self.current, self._params)
+            if spec is None:
+                raise RuntimeError("no pattern is playing")
+            params = {**current, **params}
+            spec.check(params)
+            self._pending = (spec, params)
+
+    def set_fps(self, fps):
+        """Fix the frame rate (None for each pattern's own) and restart the pattern"""
+        self.fps = fps
+        with self._lock:
+            if self._pending is None and self.current is not None:
+                self._pending = (self.current, self._params)
+
+    def defer(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the render thread between frames"""
+        self._actions.append((func, args, kwargs))
+
+    def status(self):
+        """The playing pattern, its parameters and the clock's stats"""
+        return {
+            'pattern': self.current.name if self.current else None,
+            'params': {**self.current.defaults, **self._params} if self.current else {},
+            'running': self._running,
+            'error': self.error,
+            **self.clock.stats(),
+        }
+
+    def stop(self):
+        """Leave the render loop after the current frame"""
+        self._running = False
+
+    def _start(self, spec, params):
+        fps = self.fps or spec.fps
+        if self.max_fps:
+            fps = min(fps, self.max_fps)
+        self.current = spec
+        self._params = params
+        self._frames = frames(spec, Canvas(self.matrix.mapping), fps, **params)
+        self._produced = 0
+        if fps != self.clock.fps:
+            self.clock = FrameClock(fps)
+        self.clock.start()
+        if self.metrics:
+            self.metrics.reset_interval()
+
+    def _failed(self, error):
+        """Report a pattern that raised and go back to the last one that worked"""
+        self.error = f"{self.current.name}: {error!r}"
+        print(f"Pattern {self.error}", file=sys.stderr)
+        spec, params = self._fallback or (None, None)
+        if spec is None or (spec is self.current and params is self._params):
+            raise error
+        self._start(spec, params)
+
+    def run(self, name=None, loop=True, **params):
+        """Render loop: play a pattern until it ends (or forever if loop)
+
+        A pattern that raises is reported and replaced by the last one that
+        showed a frame; with nothing to go back to, the error propagates.
+        Returns the frame clock for the pattern that was playing last.
+        """
+        if name is not None:
+            self._start(self.registry.get(name), params)
+        self._running = True
+        try:
+            while self._running:
+                if self._pending is not None:
+                    with self._lock:
+                        spec, params = self._pending
+                        self._pending = None
+                    self._start(spec, params)
+                while self._actions:
+                    func, args, kwargs = self._actions.popleft()
+                    try:
+                        func(*args, **kwargs)
+                    except Exception as e:
+                        self.error = repr(e)
+                        print(f"Deferred {getattr(func, '__name__', func)} failed: {e!r}", file=sys.stderr)
+
+                began = time.monotonic()
+                try:
+                    frame = next(self._frames, None)
+                except Exception as e:
+                    self._failed(e)
+                    continue
+                if frame is None:
+                    if not loop:
+                        break
+                    if not self._produced:
+                        # Restarting would spin without ever showing anything
+                        self._failed(RuntimeError(f"pattern {self.current.name!r} produced no frames"))
+                        continue
+                    self._start(self.current, self._params)
+                    continue
+                if not self._produced:
+                    self._fallback = (self.current, self._params)
+                self._produced += 1
+                rendered = time.monotonic()
+                if self.clock.should_drop(rendered - began):
+                    if self.metrics:
+                        self.metrics.record_drop()
+                    continue
+                np.copyto(self.matrix.frame, frame)
+                self.matrix.show()
+                shown = time.monotonic()
+                slack = self.clock.wait()
+                if self.metrics:
+                    self.metrics.record_frame(rendered - began, shown - rendered, slack, self.clock.period)
+        finally:
+            self._running = False
+        return self.clock
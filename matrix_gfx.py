@@ -0,0 +1,209 @@
+"""Sprites, clipped blits, primitives and layer compositing on (H, W, 3) frames.
+
+Everything here works on whole NumPy slices: a blit is one clipped slice
+operation and compositing a layer stack costs one vectorized pass per
+layer, however many pixels each layer touches.
+"""
+import numpy as np
+from matrix_color import color_to_rgb
+
+BLEND_MODES = ('over', 'add', 'multiply', 'screen', 'max')
+
+class Sprite:
+    """An RGB image with an optional alpha mask.
+
+    alpha is None (opaque), a bool mask, or uint8 coverage 0-255.
+    """
+
+    def __init__(self, rgb, alpha=None):
+        self.rgb = np.asarray(rgb, dtype=np.uint8)
+        self.alpha = alpha
+        self.height, self.width = self.rgb.shape[:2]
+
+    @classmethod
+    def from_mask(cls, mask, color):
+        """A single-color sprite shaped by a bool mask"""
+        mask = np.asarray(mask, dtype=bool)
+        rgb = np.empty(mask.shape + (3,), dtype=np.uint8)
+        rgb[:] = color_to_rgb(color)
+        return cls(rgb, mask)
+
+    @classmethod
+    def solid(cls, width, height, color):
+        """An opaque rectangle"""
+        rgb = np.empty((height, width, 3), dtype=np.uint8)
+        rgb[:] = color_to_rgb(color)
+        return cls(rgb)
+
+    @classmethod
+    def disc(cls, radius, color):
+        """A filled circle of the given radius, antialiased through alpha"""
+        size = 2 * radius + 1
+        y, x = np.mgrid[:size, :size] - radius
+        coverage = np.clip(radius + 0.5 - np.hypot(x, y), 0.0, 1.0)
+        rgb = np.empty((size, size, 3), dtype=np.uint8)
+        rgb[:] = color_to_rgb(color)
+        return cls(rgb, np.round(coverage * 255).astype(np.uint8))
+
+def clip(frame, x, y, width, height):
+    """Slices of frame and of a width x height source placed at x, y.
+
+    Returns (frame_slices, source_slices), or None if nothing is visible.
+    """
+    frame_height, frame_width = frame.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + width, frame_width), min(y + height, frame_height)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return ((slice(y0, y1), slice(x0, x1)),
+            (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)))
+
+def blit(frame, sprite, x, y, mode='over', opacity=1.0):
+    """Draw a sprite with its top left corner at x, y, clipped to the frame"""
+    visible = clip(frame, x, y, sprite.width, sprite.height)
+    if visible is None:
+        return
+    dst, src = visible
+    target = frame[dst]
+    rgb = sprite.rgb[src]
+    alpha = None if sprite.alpha is None else sprite.alpha[src]
+    if mode == 'over' and opacity >= 1.0 and (alpha is None or alpha.dtype == bool):
+        # Hard-edged sprites are a plain (masked) copy
+        if alpha is None:
+            target[:] = rgb
+        else:
+            np.copyto(target, rgb, where=alpha[:, :, None])
+        return
+    if alpha is None:
+        alpha = np.full(rgb.shape[:2], 255, dtype=np.uint8)
+    blend(target, rgb, alpha, mode, opacity)
+
+def blend(dst, src, alpha, mode='over', opacity=1.0, scratch=None):
+    """Blend src into dst in place, weighted by alpha (bool or uint8) and opacity.
+
+    scratch, if given, is a pair of int32 arrays shaped like dst to avoid
+    allocating temporaries every frame.
+    """
+    if scratch is None:
+        scratch = (np.empty(dst.shape, dtype=np.int32), np.empty(dst.shape, dtype=np.int32))
+    result, weight = scratch
+
+    # result = the blend mode applied at full strength
+    if mode == 'over':
+        np.copyto(result, src)
+    elif mode == 'add':
+        np.add(dst, src, out=result, dtype=np.int32)
+        np.minimum(result, 255, out=result)
+    elif mode == 'multiply':
+        np.multiply(dst, src, out=result, dtype=np.int32)
+        result //= 255
+    elif mode == 'screen':
+        np.subtract(255, dst, out=result, dtype=np.int32)
+        np.subtract(255, src, out=weight, dtype=np.int32)
+        result *= weight
+        result //= 255
+        np.subtract(255, result, out=result)
+    elif mode == 'max':
+        np.maximum(dst, src, out=result, dtype=np.int32)
+    else:
+        raise ValueError(f"unknown blend mode {mode!r}, expected one of {BLEND_MODES}")
+
+    # dst += (result - dst) * alpha * opacity / 255
+    weight[:] = alpha[:, :, None]
+    if alpha.dtype == bool:
+        weight *= 255
+    if opacity < 1.0:
+        weight *= int(opacity * 256)
+        weight >>= 8
+    result -= dst
+    result *= weight
+    result += 127
+    result //= 255
+    result += dst
+    np.copyto(dst, result, casting='unsafe')
+
+def hline(frame, x0, x1, y, color):
+    """Horizontal line from x0 to x1 inclusive"""
+    if 0 <= y < frame.shape[0]:
+        frame[y, max(min(x0, x1), 0):max(x0, x1) + 1] = color_to_rgb(color)
+
+def vline(frame, x, y0, y1, color):
+    """Vertical line from y0 to y1 inclusive"""
+    if 0 <= x < frame.shape[1]:
+        frame[max(min(y0, y1), 0):max(y0, y1) + 1, x] = color_to_rgb(color)
+
+def line(frame, x0, y0, x1, y1, color):
+    """Straight line between two points, all pixels set in one assignment"""
+    steps = max(abs(x1 - x0), abs(y1 - y0)) + 1
+    xs = np.rint(np.linspace(x0, x1, steps)).astype(np.intp)
+    ys = np.rint(np.linspace(y0, y1, steps)).astype(np.intp)
+    inside = (xs >= 0) & (xs < frame.shape[1]) & (ys >= 0) & (ys < frame.shape[0])
+    frame[ys[inside], xs[inside]] = color_to_rgb(color)
+
+def rect(frame, x, y, width, height, color, fill=True):
+    """Rectangle with its top left corner at x, y, filled or outlined"""
+    visible = clip(frame, x, y, width, height)
+    if visible is None:
+        return
+    if fill:
+        frame[visible[0]] = color_to_rgb(color)
+        return
+    hline(frame, x, x + width - 1, y, color)
+    hline(frame, x, x + width - 1, y + height - 1, color)
+    vline(frame, x, y, y + height - 1, color)
+    vline(frame, x + width - 1, y, y + height - 1, color)
+
+class Layer:
+    """A full-canvas RGB image plus alpha, blended with a mode and opacity.
+
+    With key_black set, alpha is derived at composite time: black pixels
+    are transparent, so any pattern's frame can be used as an overlay.
+    """
+
+    def __init__(self, width, height, mode='over', opacity=1.0, key_black=False):
+        if mode not in BLEND_MODES:
+            raise ValueError(f"unknown blend mode {mode!r}, expected one of {BLEND_MODES}")
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.alpha = np.full((height, width), 255, dtype=np.uint8)
+        self.mode = mode
+        self.opacity = opacity
+        self.key_black = key_black
+        self.visible = True
+
+    def clear(self):
+        self.frame[:] = 0
+        self.alpha[:] = 0
+
+class LayerStack:
+    """Composites layers bottom to top into a frame, one pass per layer"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.layers = []
+        # Blend temporaries, allocated once
+        self._scratch = (np.empty((height, width, 3), dtype=np.int32),
+                         np.empty((height, width, 3), dtype=np.int32))
+        self._key = np.empty((height, width), dtype=bool)
+
+    def add(self, mode='over', opacity=1.0, key_black=False):
+        """Append a new top layer and return it"""
+        layer = Layer(self.width, self.height, mode, opacity, key_black)
+        self.layers.append(layer)
+        return layer
+
+    def composite(self, out):
+        """Blend every visible layer into out, which starts black"""
+        out[:] = 0
+        for layer in self.layers:
+            if not layer.visible or layer.opacity <= 0:
+                continue
+            alpha = layer.alpha
+            if layer.key_black:
+                np.any(layer.frame, axis=2, out=self._key)
+                alpha = self._key
+            if layer.mode == 'over' and layer.opacity >= 1.0 and alpha.dtype == bool:
+                np.copyto(out, layer.frame, where=alpha[:, :, None])
+            else:
+                blend(out, layer.frame, alpha, layer.mode, layer.opacity, self._scratch)
+        return out
@@ -0,0 +1,174 @@
+"""Still image and animated GIF playback.
+
+A file is decoded once: every frame is composited onto black, resized to
+the canvas with Lanczos filtering, remapped to LED order and gamma
+corrected, so playback just hands ready-made LED data to show_leds().
+Decoded images live in a byte-bounded LRU cache keyed by file, modification
+time and geometry. Animations too large for the cache are decoded lazily on
+each pass instead of being held in memory.
+
+Needs Pillow (pip install pillow), imported on first use.
+"""
+import collections
+import os
+import numpy as np
+from matrix_clock import FrameClock
+from matrix_color import apply_lut
+
+IMAGE_EXTENSIONS = ('.gif', '.png', '.jpg', '.jpeg', '.bmp', '.webp')
+FIT_MODES = ('contain', 'cover', 'stretch')
+# GIF delays are in hundredths of a second, so a 100 fps clock honours them exactly
+PLAYBACK_FPS = 100
+# Browsers treat tiny GIF delays as 100 ms; so do we
+MIN_DELAY = 0.02
+DEFAULT_DELAY = 0.1
+
+def _fit(image, width, height, fit):
+    from PIL import Image, ImageOps
+    if fit == 'stretch':
+        return image.resize((width, height), Image.LANCZOS)
+    if fit == 'cover':
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    return ImageOps.pad(image, (width, height), Image.LANCZOS, color=(0, 0, 0))
+
+def _frame_rgb(frame):
+    """One decoded frame as an RGB image, transparency composited onto black"""
+    from PIL import Image
+    rgba = frame.convert('RGBA')
+    black = Image.new('RGBA', rgba.size, (0, 0, 0, 255))
+    return Image.alpha_composite(black, rgba).convert('RGB')
+
+def decode_frames(path, mapping, gamma=None, fit='contain'):
+    """Generator of (leds, seconds) for each frame of an image file.
+
+    leds is a fresh (N, 3) LED-ordered array with gamma (a 256-entry
+    table) already applied.
+    """
+    from PIL import Image, ImageSequence
+    with Image.open(path) as image:
+        for frame in ImageSequence.Iterator(image):
+            delay = frame.info.get('duration', 0) / 1000.0
+            if delay < MIN_DELAY:
+                delay = DEFAULT_DELAY
+            pixels = np.asarray(_fit(_frame_rgb(frame), mapping.width, mapping.height, fit),
+                                dtype=np.uint8)
+            leds = mapping.to_leds(pixels)
+            if gamma is not None:
+                apply_lut(leds, gamma, out=leds)
+            yield leds, delay
+
+class ImageAnimation:
+    """A fully decoded image: (frames, N, 3) LED data and per-frame durations"""
+
+    def __init__(self, frames, durations):
+        self.frames = frames
+        self.durations = durations
+        self.nbytes = frames.nbytes
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        return zip(self.frames, self.durations)
+
+class StreamedImage:
+    """An animation decoded frame by frame on every pass, never held whole"""
+
+    def __init__(self, path, mapping, gamma=None, fit='contain'):
+        self.path = path
+        self.mapping = mapping
+        self.gamma = gamma
+        self.fit = fit
+
+    def __iter__(self):
+        return decode_frames(self.path, self.mapping, self.gamma, self.fit)
+
+class ImageCache:
+    """LRU cache of decoded images, bounded by total frame bytes"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, mapping, gamma=None, fit='contain'):
+        """The decoded image for a file, or a StreamedImage if it is too big to keep"""
+        if fit not in FIT_MODES:
+            raise ValueError(f"unknown fit {fit!r}, expected one of {FIT_MODES}")
+        path = os.path.realpath(path)
+        key = (path, os.stat(path).st_mtime_ns, mapping.index_map.shape,
+               mapping.index_map.tobytes(), None if gamma is None else gamma.tobytes(), fit)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+
+        from PIL import Image
+        with Image.open(path) as image:
+            count = getattr(image, 'n_frames', 1)
+        if count * mapping.count * 3 > self.max_bytes:
+            return StreamedImage(path, mapping, gamma, fit)
+
+        frames = np.empty((count, mapping.count, 3), dtype=np.uint8)
+        durations = np.empty(count)
+        for i, (leds, delay) in enumerate(decode_frames(path, mapping, gamma, fit)):
+            frames[i] = leds
+            durations[i] = delay
+        frames.flags.writeable = False
+        entry = ImageAnimation(frames, durations)
+
+        self._entries[key] = entry
+        self.nbytes += entry.nbytes
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return entry
+
+# Shared by every player in the process
+IMAGE_CACHE = ImageCache()
+
+def image_paths(paths):
+    """Expand directories into their image files, sorted by name"""
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                   if name.lower().endswith(IMAGE_EXTENSIONS)))
+        else:
+            expanded.append(path)
+    return expanded
+
+def play(matrix, image, loops=1, hold=5.0, clock=None):
+    """Show an image on a matrix, honouring each frame's own duration
+
+    Single-frame images are held for hold seconds per loop. loops=None
+    repeats forever. Returns the frame clock.
+    """
+    clock = clock or FrameClock(PLAYBACK_FPS)
+    clock.start()
+    # A still image is held rather than re-sent every tick
+    still = isinstance(image, ImageAnimation) and len(image) == 1
+    loop = 0
+    while loops is None or loop < loops:
+        for leds, delay in image:
+            matrix.show_leds(leds, corrected=True)
+            clock.wait(max(1, round((hold if still else delay) * clock.fps)))
+        loop += 1
+    return clock
+
+def play_files(matrix, paths, loops=None, hold=5.0, fit='contain', cache=IMAGE_CACHE):
+    """Play a list of image files (and directories of them) in turn"""
+    paths = image_paths(paths)
+    if not paths:
+        raise ValueError("no image files to play")
+    clock = FrameClock(PLAYBACK_FPS)
+    loop = 0
+    while loops is None or loop < loops:
+        for path in paths:
+            image = cache.get(path, matrix.mapping, matrix.gamma_lut, fit)
+            play(matrix, image, loops=1, hold=hold, clock=clock)
+        loop += 1
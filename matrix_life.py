@@ -0,0 +1,142 @@
+"""Cellular automata (Conway's Life and other B/S rules) on a wrapping grid.
+
+Cells live in the middle of a padded uint8 array whose one-cell border is
+refreshed from the opposite edges each generation, so the eight neighbour
+counts are plain slice additions with toroidal wrap and no np.roll copies.
+The birth/survival rule is an 18-entry table indexed by count + 9 * alive,
+making a generation a handful of whole-array operations at any grid size.
+Cells are colored by age through a palette table. Each generation's packed
+bits are hashed; a repeat within the last HISTORY generations means the
+board has settled into a still life or cycle, and it is reseeded.
+"""
+import collections
+import numpy as np
+from matrix_color import make_palette
+
+RULES = {
+    'life': 'B3/S23',
+    'highlife': 'B36/S23',
+    'seeds': 'B2/S',
+    'daynight': 'B3678/S34678',
+    'maze': 'B3/S12345',
+}
+# Generations remembered for cycle detection; longer cycles are not noticed
+HISTORY = 64
+# Ages beyond this share the oldest palette color
+MAX_AGE = 63
+# Newborn cells are white, cooling through yellow and red to a dim blue
+AGE_PALETTE = np.concatenate((
+    np.zeros((1, 3), dtype=np.uint8),
+    make_palette([(255, 255, 255), (255, 220, 0), (255, 64, 0), (160, 0, 96), (16, 0, 96)],
+                 [0, 16, 64, 160, 255])[np.linspace(0, 255, MAX_AGE).astype(int)]))
+
+def parse_rule(rule):
+    """An 18-entry uint8 table mapping neighbours + 9 * alive to the next state.
+
+    rule is 'B3/S23' notation or one of the RULES names.
+    """
+    rule = RULES.get(rule, rule)
+    try:
+        born, survive = rule.upper().split('/')
+        if not (born.startswith('B') and survive.startswith('S')) or '9' in born + survive:
+            raise ValueError
+        table = np.zeros(18, dtype=np.uint8)
+        table[[int(n) for n in born[1:]]] = 1
+        table[[9 + int(n) for n in survive[1:]]] = 1
+    except (ValueError, IndexError):
+        raise ValueError(f"bad rule {rule!r}, expected B/S notation like 'B3/S23' "
+                         f"or one of {list(RULES)}") from None
+    return table
+
+class Life:
+    """A width x height automaton with toroidal wrap and per-cell ages"""
+
+    def __init__(self, width, height, rule='life', density=0.35, seed=None):
+        self.width = width
+        self.height = height
+        self.table = parse_rule(rule)
+        self.density = density
+        self.rng = np.random.default_rng(seed)
+        # Cells plus a wrapped border; cells is a view of the middle
+        self._padded = np.zeros((height + 2, width + 2), dtype=np.uint8)
+        self.cells = self._padded[1:-1, 1:-1]
+        self.ages = np.zeros((height, width), dtype=np.uint8)
+        # Scratch arrays, allocated once
+        self._counts = np.empty((height, width), dtype=np.uint8)
+        self._index = np.empty((height, width), dtype=np.uint8)
+        self._recent = collections.deque(maxlen=HISTORY)
+        self.generation = 0
+        self.settled_at = None
+        self.reseeds = 0
+        self.seed()
+
+    def seed(self):
+        """Fill the grid with random cells at the configured density"""
+        self.cells[:] = self.rng.random((self.height, self.width)) < self.density
+        np.copyto(self.ages, self.cells)
+        self._recent.clear()
+        self.settled_at = None
+        self.generation = 0
+
+    @property
+    def population(self):
+        return int(np.count_nonzero(self.cells))
+
+    def step(self):
+        """Advance one generation"""
+        p = self._padded
+        # Wrap: copy the opposite edges into the border (columns after rows fills the corners)
+        p[0, 1:-1] = p[-2, 1:-1]
+        p[-1, 1:-1] = p[1, 1:-1]
+        p[:, 0] = p[:, -2]
+        p[:, -1] = p[:, 1]
+
+        counts = self._counts
+        np.add(p[:-2, :-2], p[:-2, 1:-1], out=counts)
+        counts += p[:-2, 2:]
+        counts += p[1:-1, :-2]
+        counts += p[1:-1, 2:]
+        counts += p[2:, :-2]
+        counts += p[2:, 1:-1]
+        counts += p[2:, 2:]
+
+        index = self._index
+        np.multiply(self.cells, 9, out=index)
+        index += counts
+        np.take(self.table, index, out=self.cells, mode='clip')
+
+        # Survivors age by one, capped; dead cells drop to 0 and newborns start at 1
+        np.minimum(self.ages, MAX_AGE - 1, out=self.ages)
+        self.ages += 1
+        self.ages *= self.cells
+        self.generation += 1
+        self._check_settled()
+
+    def _check_settled(self):
+        if self.settled_at is not None:
+            return
+        key = hash(np.packbits(self.cells).tobytes())
+        if key in self._recent or not self.cells.any():
+            self.settled_at = self.generation
+        self._recent.append(key)
+
+    def render(self, frame, palette=AGE_PALETTE):
+        """Color every cell by its age into an (H, W, 3) frame"""
+        return np.take(palette, self.ages, axis=0, out=frame, mode='clip')
+
+def life(canvas, rule='life', density=0.35, generations=None, hold=20, seed=None,
+         palette=AGE_PALETTE):
+    """Pattern generator running an automaton, reseeding hold generations after it settles.
+
+    Runs forever unless generations is given.
+    """
+    sim = Life(canvas.WIDTH, canvas.HEIGHT, rule, density, seed)
+    shown = 0
+    while generations is None or shown < generations:
+        yield sim.render(canvas.frame, palette)
+        shown += 1
+        if sim.settled_at is not None and sim.generation - sim.settled_at >= hold:
+            sim.reseeds += 1
+            sim.seed()
+        else:
+            sim.step()
@@ -0,0 +1,106 @@
+"""Coordinate mapping between the x,y canvas and LED chain order."""
+import functools
+import numpy as np
+
+class MatrixMapping:
+    """Forward and inverse lookup tables for one matrix geometry.
+
+    The canvas is built from tiles_x * tiles_y panels of panel_width x
+    panel_height LEDs, chained row by row. Rotation (clockwise degrees) and
+    flips are applied to the whole canvas, so patterns always draw upright.
+    """
+
+    def __init__(self, panel_width=16, panel_height=16, tiles_x=1, tiles_y=1,
+                 serpentine=True, tile_serpentine=False, rotation=0,
+                 flip_x=False, flip_y=False):
+        if rotation not in (0, 90, 180, 270):
+            raise ValueError(f"rotation must be 0, 90, 180 or 270, not {rotation}")
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+        self.tiles_x = tiles_x
+        self.tiles_y = tiles_y
+        self.count = panel_width * panel_height * tiles_x * tiles_y
+
+        # LED index of every position on one panel
+        panel = np.arange(panel_width * panel_height).reshape(panel_height, panel_width)
+        if serpentine:
+            # Odd rows go right to left
+            panel[1::2] = panel[1::2, ::-1]
+
+        # Lay the panels out in chain order
+        physical = np.empty((panel_height * tiles_y, panel_width * tiles_x), dtype=np.intp)
+        for tile in range(tiles_x * tiles_y):
+            ty, tx = divmod(tile, tiles_x)
+            if tile_serpentine and ty % 2 == 1:
+                tx = tiles_x - 1 - tx
+            physical[ty * panel_height:(ty + 1) * panel_height,
+                     tx * panel_width:(tx + 1) * panel_width] = panel + tile * panel.size
+
+        if flip_x:
+            physical = physical[:, ::-1]
+        if flip_y:
+            physical = physical[::-1]
+        grid = np.rot90(physical, -(rotation // 90))
+
+        # Forward table: index_map[y, x] is the LED index of canvas pixel x,y
+        self.index_map = np.ascontiguousarray(grid)
+        self.height, self.width = self.index_map.shape
+
+        # Inverse table: order[i] is the flat canvas offset feeding LED i
+        self.order = np.empty(self.count, dtype=np.intp)
+        self.order[self.index_map.ravel()] = np.arange(self.count)
+        self.ys, self.xs = np.divmod(self.order, self.width)
+
+        # Plain lists make single lookups cheaper than NumPy scalar indexing
+        self._forward = self.index_map.tolist()
+        self._inverse = list(zip(self.xs.tolist(), self.ys.tolist()))
+
+    def xy_to_index(self, x, y):
+        """Convert x,y coordinates to LED index"""
+        return self._forward[y][x]
+
+    def index_to_xy(self, index):
+        """Convert LED index to x,y coordinates"""
+        return self._inverse[index]
+
+    def to_leds(self, frame, out=None):
+        """Permute an (H, W, 3) frame into (N, 3) LED order"""
+        # mode='clip' (the tables are always in range) stops np.take from
+        # buffering through a temporary array when out= is given
+        return np.take(frame.reshape(-1, 3), self.order, axis=0, out=out, mode='clip')
+
+    def from_leds(self, leds, out=None):
+        """Permute (N, 3) LED-ordered data back into an (H, W, 3) frame"""
+        frame = np.take(leds, self.index_map.ravel(), axis=0, out=out, mode='clip')
+        return frame.reshape(self.height, self.width, 3)
+
+@functools.lru_cache(maxsize=None)
+def get_mapping(width=16, height=16, tiles_x=1, tiles_y=1, serpentine=True,
+                tile_serpentine=False, rotation=0, flip_x=False, flip_y=False):
+    """Return the shared mapping for a geometry, building its tables once.
+
+    width and height are the size of a single panel.
+    """
+    return MatrixMapping(width, height, tiles_x, tiles_y, serpentine,
+                         tile_serpentine, rotation, flip_x, flip_y)
+
+def add_mapping_arguments(parser):
+    """Add the wiring/geometry options shared by the matrix scripts"""
+    parser.add_argument('--width', type=int, default=16, help='Panel width in pixels')
+    parser.add_argument('--height', type=int, default=16, help='Panel height in pixels')
+    parser.add_argument('--tiles-x', type=int, default=1, help='Panels chained horizontally')
+    parser.add_argument('--tiles-y', type=int, default=1, help='Panels chained vertically')
+    parser.add_argument('--progressive', action='store_true',
+                        help='Rows all run left to right instead of zigzag')
+    parser.add_argument('--tile-serpentine', action='store_true',
+                        help='Odd rows of panels are chained right to left')
+    parser.add_argument('--rotation', type=int, default=0, choices=[0, 90, 180, 270],
+                        help='Rotate the canvas clockwise by this many degrees')
+    parser.add_argument('--flip-x', action='store_true', help='Mirror the canvas horizontally')
+    parser.add_argument('--flip-y', action='store_true', help='Mirror the canvas vertically')
+
+def mapping_from_args(args):
+    """Build the mapping described by add_mapping_arguments() options"""
+    return get_mapping(args.width, args.height, args.tiles_x, args.tiles_y,
+                       not args.progressive, args.tile_serpentine, args.rotation,
+                       args.flip_x, args.flip_y)
@@ -0,0 +1,250 @@
+"""Frame timing metrics for the render loop.
+
+Every shown frame records its render time, show() time, sleep slack and
+jitter (how far the frame interval strayed from the period) into fixed-size
+histograms; recording is a few float operations and one list bisect. The
+numbers come out as a periodic log line, a Prometheus text file (for the
+node_exporter textfile collector) or a /metrics HTTP endpoint. A cProfile
+run of the render thread can be started and stopped at runtime with
+SIGUSR1 or the control server's "profile" command.
+"""
+import bisect
+import io
+import os
+import signal
+import sys
+import threading
+import time
+import numpy as np
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25)
+SLACK_BUCKETS = (-0.05, -0.01, -0.002, 0.0, 0.002, 0.005, 0.01, 0.02, 0.05)
+DEFAULT_PROFILE = '/tmp/wyp-pi.prof'
+
+class Histogram:
+    """Cumulative bucket counts plus a ring buffer of recent samples"""
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, capacity=1024):
+        self.name = name
+        self.help = help
+        self.buckets = list(buckets)
+        self.capacity = capacity
+        self.samples = np.zeros(capacity)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        self.samples[self.count % self.capacity] = value
+        self.count += 1
+        self.sum += value
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+
+    def recent(self):
+        """The retained samples (unordered)"""
+        return self.samples[:min(self.count, self.capacity)]
+
+    def percentiles(self, q=(50, 90, 99)):
+        """Percentiles of the recent samples, in the recorded unit"""
+        recent = self.recent()
+        if not recent.size:
+            return [0.0] * len(q)
+        return np.percentile(recent, q).tolist()
+
+    def prometheus(self, prefix):
+        name = f"{prefix}_{self.name}"
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} histogram"]
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            lines.append(f'{name}_bucket{{le="{bound:g}"}} {total}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.sum:.6f}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+class FrameMetrics:
+    """Render loop instrumentation: histograms, counters and outputs"""
+
+    def __init__(self, capacity=1024, log_interval=None, textfile=None,
+                 profile_path=DEFAULT_PROFILE, prefix='wyp'):
+        self.prefix = prefix
+        self.render = Histogram('render_seconds', 'Time to render a frame', capacity=capacity)
+        self.show = Histogram('show_seconds', 'Time spent in show()', capacity=capacity)
+        self.slack = Histogram('slack_seconds', 'Time left before the frame deadline',
+                               SLACK_BUCKETS, capacity)
+        self.jitter = Histogram('jitter_seconds', 'Deviation of the frame interval from the period',
+                                capacity=capacity)
+        self.histograms = (self.render, self.show, self.slack, self.jitter)
+        self.frames = 0
+        self.dropped = 0
+        # Extra gauges: name -> (help, zero-argument callable)
+        self.gauges = {}
+        self.log_interval = log_interval
+        self.textfile = textfile
+        self.profile_path = profile_path
+        self._last_frame = None
+        self._last_output = time.monotonic()
+        self._profiler = None
+        self._profile_wanted = False
+        self._server = None
+
+    def gauge(self, name, help, func):
+        """Export func() as a gauge"""
+        self.gauges[name] = (help, func)
+
+    def record_frame(self, render, show, slack, period):
+        """Record one shown frame; called from the render loop"""
+        now = time.perf_counter()
+        self.frames += 1
+        self.render.record(render)
+        self.show.record(show)
+        self.slack.record(slack)
+        if self._last_frame is not None:
+            self.jitter.record(abs(now - self._last_frame - period))
+        self._last_frame = now
+        self.tick()
+
+    def record_drop(self):
+        self.dropped += 1
+        # The next interval spans the dropped frame, so it says nothing about jitter
+        self._last_frame = None
+
+    def reset_interval(self):
+        """Forget the last frame time, e.g. after a pattern switch"""
+        self._last_frame = None
+
+    def tick(self):
+        """Periodic work at a frame boundary: profiler toggles, log line, text file"""
+        if self._profile_wanted != (self._profiler is not None):
+            self._toggle_profiler()
+        if self.log_interval is None and self.textfile is None:
+            return
+        now = time.monotonic()
+        if now - self._last_output < (self.log_interval or 10.0):
+            return
+        self._last_output = now
+        if self.log_interval is not None:
+            print(self.summary(), file=sys.stderr)
+        if self.textfile:
+            self.write_textfile(self.textfile)
+
+    def summary(self):
+        """One log line of recent timings, in milliseconds"""
+        parts = [f"frames {self.frames}, dropped {self.dropped}"]
+        for histogram in self.histograms:
+            p50, p99 = (1000 * v for v in histogram.percentiles((50, 99)))
+            parts.append(f"{histogram.name.split('_')[0]} p50 {p50:.2f} p99 {p99:.2f}")
+        return " | ".join(parts)
+
+    def stats(self):
+        """Recent percentiles (ms) and counters as a dict"""
+        stats = {'frames': self.frames, 'dropped': self.dropped,
+                 'profiling': self._profiler is not None}
+        for histogram in self.histograms:
+            p50, p90, p99 = histogram.percentiles()
+            stats[histogram.name.split('_')[0]] = {
+                'p50_ms': round(1000 * p50, 3), 'p90_ms': round(1000 * p90, 3),
+                'p99_ms': round(1000 * p99, 3)}
+        return stats
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.prometheus(self.prefix))
+        for name, help, value in (('frames_shown_total', 'Frames shown', self.frames),
+                                  ('frames_dropped_total', 'Frames dropped to catch up', self.dropped)):
+            lines += [f"# HELP {self.prefix}_{name} {help}",
+                      f"# TYPE {self.prefix}_{name} counter", f"{self.prefix}_{name} {value}"]
+        for name, (help, func) in self.gauges.items():
+            lines += [f"# HELP {self.prefix}_{name} {help}",
+                      f"# TYPE {self.prefix}_{name} gauge", f"{self.prefix}_{name} {func():g}"]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Write the metrics atomically, for the node_exporter textfile collector"""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve GET /metrics from a background thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+        return self._server.server_address
+
+    def set_profiling(self, enabled):
+        """Ask the render thread to start or stop profiling at its next frame"""
+        self._profile_wanted = bool(enabled)
+
+    def toggle_profiling(self, *args):
+        """Flip profiling on or off (usable as a signal handler)"""
+        self._profile_wanted = not self._profile_wanted
+
+    def _toggle_profiler(self):
+        # cProfile only sees the thread that enables it, so this runs in the render loop
+        import cProfile
+        import pstats
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+            print("Profiling started", file=sys.stderr)
+            return
+        self._profiler.disable()
+        self._profiler.dump_stats(self.profile_path)
+        report = io.StringIO()
+        pstats.Stats(self._profiler, stream=report).sort_stats('cumulative').print_stats(15)
+        self._profiler = None
+        print(f"Profile written to {self.profile_path}\n{report.getvalue()}", file=sys.stderr)
+
+    def close(self):
+        if self._profiler is not None:
+            self._profile_wanted = False
+            self._toggle_profiler()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+def add_metrics_arguments(parser):
+    """Add the instrumentation options shared by the matrix scripts"""
+    parser.add_argument('--metrics-interval', type=float, default=None, metavar='SECONDS',
+                        help='Log frame timing percentiles every SECONDS')
+    parser.add_argument('--metrics-file', default=None,
+                        help='Write Prometheus metrics to this file periodically')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+
+def metrics_from_args(args):
+    """Build FrameMetrics for add_metrics_arguments() options, or None if unused
+
+    Also makes SIGUSR1 toggle the profiler.
+    """
+    if args.metrics_interval is None and args.metrics_file is None and args.metrics_port is None:
+        return None
+    metrics = FrameMetrics(log_interval=args.metrics_interval, textfile=args.metrics_file)
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, metrics.toggle_profiling)
+    return metrics
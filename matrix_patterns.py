@@ -1,161 +1,121 @@
 #!/usr/bin/env python3
-import time
 import argparse
-import board
-import neopixel
-import random
-
-# Set up argument parser
-parser = argparse.ArgumentParser(description='Display patterns on a 16x16 NeoPixel matrix.')
-parser.add_argument('--pin', default='D18', help='GPIO pin (in board numbering) connected to NeoPixels')
-parser.add_argument('--brightness', type=float, default=0.2, help='Brightness level (0.0 to 1.0)')
-parser.add_argument('--pattern', default='rainbow', 
-                    choices=['rainbow', 'bounce', 'sparkle', 'wipe', 'pulse', 'spiral'],
-                    help='Pattern to display')
-args = parser.parse_args()
+import numpy as np
+from matrix_backends import CircuitPythonBackend, NullBackend, brightness_level
+from matrix_color import WHEEL, brightness_lut, scale
+from matrix_control import add_control_arguments, server_from_args
+from matrix_display import NeoMatrix
+from matrix_engine import Engine, PatternRegistry
+from matrix_mapping import get_mapping
+from matrix_metrics import add_metrics_arguments, metrics_from_args
+from matrix_particles import sparkle as particle_sparkle
+from matrix_power import add_power_arguments, power_from_args
 
 # Matrix dimensions
 WIDTH = 16
 HEIGHT = 16
 NUM_PIXELS = WIDTH * HEIGHT
 
-# Create NeoPixel object
-pixel_pin = getattr(board, args.pin)
-pixels = neopixel.NeoPixel(
-    pixel_pin, NUM_PIXELS, brightness=args.brightness, auto_write=False, pixel_order=neopixel.GRB
-)
+# Serpentine (zigzag) lookup tables, built once
+MAPPING = get_mapping(WIDTH, HEIGHT)
 
 def xy_to_index(x, y):
     """Convert x,y coordinates to pixel index
     For serpentine layout (zigzag) common in 16x16 matrices"""
-    if y % 2 == 0:
-        # Even rows go left to right
-        return y * WIDTH + x
-    else:
-        # Odd rows go right to left
-        return y * WIDTH + (WIDTH - 1 - x)
+    return MAPPING.xy_to_index(x, y)
 
 def index_to_xy(index):
     """Convert pixel index to x,y coordinates"""
-    y = index // WIDTH
-    if y % 2 == 0:
-        # Even rows go left to right
-        x = index % WIDTH
-    else:
-        # Odd rows go right to left
-        x = WIDTH - 1 - (index % WIDTH)
-    return x, y
-
-def wheel(pos):
-    """Generate rainbow colors across 0-255 positions."""
-    if pos < 0 or pos > 255:
-        return (0, 0, 0)
-    if pos < 85:
-        return (pos * 3, 255 - pos * 3, 0)
-    elif pos < 170:
-        pos -= 85
-        return (255 - pos * 3, 0, pos * 3)
-    else:
-        pos -= 170
-        return (0, pos * 3, 255 - pos * 3)
+    return MAPPING.index_to_xy(index)
 
-def clear():
-    """Clear the display"""
-    pixels.fill((0, 0, 0))
-    pixels.show()
+# Patterns are generators that draw into a canvas and yield one frame per
+# step; the engine paces them and pushes each frame to the output.
+PATTERNS = PatternRegistry()
 
-def rainbow_cycle(wait=0.01, cycles=5):
+@PATTERNS.register('rainbow', fps=100)
+def rainbow_cycle(canvas, cycles=5):
     """Draw rainbow that uniformly distributes itself across all pixels."""
+    # Wheel position of every pixel from its place along the LED chain
+    base = canvas.mapping.index_map * 256 // canvas.NUM_PIXELS
+    positions = np.empty_like(base)
     for j in range(255 * cycles):
-        for i in range(NUM_PIXELS):
-            pixel_index = (i * 256 // NUM_PIXELS) + j
-            pixels[i] = wheel(pixel_index & 255)
-        pixels.show()
-        time.sleep(wait)
-
-def color_wipe(color, wait=0.01):
-    """Wipe color across display a pixel at a time."""
-    for i in range(NUM_PIXELS):
-        pixels[i] = color
-        pixels.show()
-        time.sleep(wait)
-
-def bounce(color=(255, 0, 0), iterations=100, size=3, wait=0.05):
-    """Bounce a dot across the matrix."""
-    x, y = 0, 0
-    dx, dy = 1, 1
-
-    for _ in range(iterations):
-        # Clear all pixels
-        pixels.fill((0, 0, 0))
+        np.add(base, j, out=positions)
+        np.bitwise_and(positions, 255, out=positions)
+        np.take(WHEEL, positions, axis=0, out=canvas.frame, mode='clip')
+        yield canvas.frame
+
+@PATTERNS.register('wipe', fps=100)
+def color_wipe(canvas, colors=((255, 0, 0), (0, 255, 0), (0, 0, 255), (0, 0, 0))):
+    """Wipe each color across display a pixel at a time."""
+    for color in colors:
+        for i in range(canvas.NUM_PIXELS):
+            canvas.set_led(i, color)
+            yield canvas.frame
+
+@PATTERNS.register('bounce', fps=33)
+def bounce(canvas, colors=((255, 0, 0), (0, 255, 0), (0, 0, 255)), iterations=100, size=3):
+    """Bounce a dot across the matrix, once per color."""
+    for color in colors:
+        x, y = 0, 0
+        dx, dy = 1, 1
         
-        # Draw the dot and its trail
-        for i in range(size):
-            trail_x = x - i * dx if 0 <= x - i * dx < WIDTH else x
-            trail_y = y - i * dy if 0 <= y - i * dy < HEIGHT else y
+        # Trail colors fade out along the tail, scaled through brightness tables
+        rgb = np.array(color, dtype=np.uint8)
+        trail_colors = np.array([scale(rgb, 255 * (size - i) // size) for i in range(size)])
+        steps = np.arange(size)
+
+        for _ in range(iterations):
+            # Clear all pixels
+            canvas.clear()
             
-            # Calculate color intensity for trail
-            intensity = 1.0 - (i / size)
-            trail_color = tuple(int(c * intensity) for c in color)
+            # Draw the dot and its trail in one assignment; trail points off
+            # the panel fall back to the dot's own row or column
+            trail_x = x - steps * dx
+            trail_y = y - steps * dy
+            trail_x[(trail_x < 0) | (trail_x >= canvas.WIDTH)] = x
+            trail_y[(trail_y < 0) | (trail_y >= canvas.HEIGHT)] = y
+            canvas.frame[trail_y, trail_x] = trail_colors
             
-            # Set the pixel
-            if 0 <= trail_x < WIDTH and 0 <= trail_y < HEIGHT:
-                pixels[xy_to_index(trail_x, trail_y)] = trail_color
-        
-        pixels.show()
-        time.sleep(wait)
-        
-        # Update position
-        x += dx
-        y += dy
-        
-        # Bounce off edges
-        if x >= WIDTH - 1 or x <= 0:
-            dx = -dx
-        if y >= HEIGHT - 1 or y <= 0:
-            dy = -dy
-
-def sparkle(iterations=50, density=10, wait=0.05):
+            yield canvas.frame
+            
+            # Update position
+            x += dx
+            y += dy
+            
+            # Bounce off edges
+            if x >= canvas.WIDTH - 1 or x <= 0:
+                dx = -dx
+            if y >= canvas.HEIGHT - 1 or y <= 0:
+                dy = -dy
+
+@PATTERNS.register('sparkle', fps=20)
+def sparkle(canvas, iterations=50, density=10):
     """Random sparkle effect."""
-    for _ in range(iterations):
-        pixels.fill((0, 0, 0))
-        
-        # Light up random pixels
-        for _ in range(density):
-            i = random.randint(0, NUM_PIXELS - 1)
-            pixels[i] = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-        
-        pixels.show()
-        time.sleep(wait)
-
-def pulse(color=(0, 0, 255), iterations=5):
-    """Pulse the entire display."""
-    for _ in range(iterations):
-        # Fade in
-        for i in range(100):
-            brightness = i / 100.0
-            pixels.fill([int(c * brightness) for c in color])
-            pixels.show()
-            time.sleep(0.01)
-        
-        # Fade out
-        for i in range(100, 0, -1):
-            brightness = i / 100.0
-            pixels.fill([int(c * brightness) for c in color])
-            pixels.show()
-            time.sleep(0.01)
-
-def spiral(wait=0.05, iterations=2):
+    yield from particle_sparkle(canvas, iterations, density, fps=20)
+
+@PATTERNS.register('pulse', fps=100)
+def pulse(canvas, colors=((255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0)), iterations=5):
+    """Pulse the entire display in each color."""
+    for color in colors:
+        rgb = np.array(color, dtype=np.uint8)
+        for _ in range(iterations):
+            # Fade in, then out: brightness i/100 via its lookup table
+            for i in list(range(100)) + list(range(100, 0, -1)):
+                canvas.frame[:] = brightness_lut(255 * i // 100)[rgb]
+                yield canvas.frame
+
+@PATTERNS.register('spiral', fps=20)
+def spiral(canvas, iterations=2, hold_frames=20):
     """Create a spiral pattern across the matrix."""
     for _ in range(iterations):
         # Define spiral path
-        x, y = WIDTH // 2, HEIGHT // 2
+        x, y = canvas.WIDTH // 2, canvas.HEIGHT // 2
         dx, dy = 0, -1
         steps = 1
         step_count = 0
         spiral_path = []
         
-        for i in range(NUM_PIXELS):
+        for i in range(canvas.NUM_PIXELS):
             spiral_path.append((x, y))
             
             # Move to next position
@@ -171,65 +131,81 @@ def spiral(wait=0.05, iterations=2):
             step_count += 1
             
             # Check if we're outside the matrix
-            if not (0 <= x < WIDTH and 0 <= y < HEIGHT):
+            if not (0 <= x < canvas.WIDTH and 0 <= y < canvas.HEIGHT):
                 break
         
         # Light up the spiral
         for x, y in spiral_path:
-            if 0 <= x < WIDTH and 0 <= y < HEIGHT:
-                idx = xy_to_index(x, y)
-                hue = (idx * 2) % 256
-                pixels[idx] = wheel(hue)
-                pixels.show()
-                time.sleep(wait)
+            if 0 <= x < canvas.WIDTH and 0 <= y < canvas.HEIGHT:
+                hue = (canvas.xy_to_index(x, y) * 2) % 256
+                canvas.frame[y, x] = WHEEL[hue]
+                yield canvas.frame
         
         # Hold the final spiral briefly
-        time.sleep(1)
+        for _ in range(hold_frames):
+            yield canvas.frame
         
-        # Turn off in reverse order
-        for x, y in reversed(spiral_path):
-            if 0 <= x < WIDTH and 0 <= y < HEIGHT:
-                pixels[xy_to_index(x, y)] = (0, 0, 0)
-                pixels.show()
-                time.sleep(wait / 2)
-
-try:
-    print(f"Running {args.pattern} pattern on a 16x16 NeoPixel matrix")
-    print(f"Connected to pin {args.pin} with brightness {args.brightness}")
-    print("Press Ctrl+C to exit")
+        # Turn off in reverse order at double speed
+        for i, (x, y) in enumerate(reversed(spiral_path)):
+            if 0 <= x < canvas.WIDTH and 0 <= y < canvas.HEIGHT:
+                canvas.frame[y, x] = 0
+                if i % 2 == 1:
+                    yield canvas.frame
+        yield canvas.frame
+
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description='Display patterns on a 16x16 NeoPixel matrix.')
+    parser.add_argument('--pin', default='D18', help='GPIO pin (in board numbering) connected to NeoPixels')
+    parser.add_argument('--brightness', type=float, default=0.2, help='Brightness level (0.0 to 1.0)')
+    parser.add_argument('--pattern', default='rainbow', 
+                        choices=PATTERNS.names(),
+                        help='Pattern to display')
+    parser.add_argument('--fps', type=float, default=None,
+                        help='Frame rate (default: each pattern\'s own rate)')
+    parser.add_argument('--backend', default='circuitpython', choices=['circuitpython', 'null'],
+                        help='Output backend (null renders without hardware)')
+    add_control_arguments(parser)
+    add_power_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
     
-    # Clear display
-    clear()
+    # The NeoPixel object is only created here, never at import time
+    if args.backend == 'null':
+        backend = NullBackend(NUM_PIXELS)
+    else:
+        backend = CircuitPythonBackend(NUM_PIXELS, args.pin, brightness_level(args.brightness))
+    matrix = NeoMatrix(brightness=args.brightness, mapping=MAPPING, backend=backend,
+                       power=power_from_args(args, NUM_PIXELS))
+    metrics = metrics_from_args(args)
+    if metrics and matrix.power:
+        metrics.gauge('estimated_milliamps', 'Estimated current draw', lambda: matrix.power.estimated_ma)
+    engine = Engine(matrix, PATTERNS, fps=args.fps, metrics=metrics)
+    control = server_from_args(engine, args)
     
-    # Run the selected pattern
-    if args.pattern == 'rainbow':
-        while True:
-            rainbow_cycle()
-    elif args.pattern == 'bounce':
-        while True:
-            bounce(color=(255, 0, 0), wait=0.03)  # Red
-            bounce(color=(0, 255, 0), wait=0.03)  # Green
-            bounce(color=(0, 0, 255), wait=0.03)  # Blue
-    elif args.pattern == 'sparkle':
-        while True:
-            sparkle()
-    elif args.pattern == 'wipe':
-        while True:
-            color_wipe((255, 0, 0))  # Red
-            color_wipe((0, 255, 0))  # Green
-            color_wipe((0, 0, 255))  # Blue
-            color_wipe((0, 0, 0))    # Off
-    elif args.pattern == 'pulse':
-        while True:
-            pulse((255, 0, 0))    # Red
-            pulse((0, 255, 0))    # Green
-            pulse((0, 0, 255))    # Blue
-            pulse((255, 255, 0))  # Yellow
-    elif args.pattern == 'spiral':
-        while True:
-            spiral()
-
-except KeyboardInterrupt:
-    # Turn off all pixels on exit
-    clear()
-    print("Program ended by user")
\ No newline at end of file
+    try:
+        print(f"Running {args.pattern} pattern on a 16x16 NeoPixel matrix")
+        print(f"Connected to pin {args.pin} with brightness {args.brightness}")
+        print("Press Ctrl+C to exit")
+        
+        # Clear display
+        matrix.clear()
+        matrix.show()
+        
+        # Run the selected pattern continuously
+        engine.run(args.pattern)
+    
+    except KeyboardInterrupt:
+        # Turn off all pixels on exit
+        matrix.clear()
+        matrix.show()
+        print("Program ended by user")
+    finally:
+        if control:
+            control.close()
+        if metrics:
+            metrics.close()
+        matrix.close()
+
+if __name__ == "__main__":
+    main()
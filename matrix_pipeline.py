@@ -0,0 +1,97 @@
+"""Dedicated output thread so rendering overlaps the LED transfer."""
+import collections
+import threading
+import numpy as np
+
+class OutputThread:
+    """Pushes LED frames to a backend from its own thread.
+
+    The render side fills a back buffer from acquire() and hands it over
+    with publish(). At most depth frames wait in the queue; when it is full
+    the oldest waiting frame is dropped and its buffer reused, so latency
+    stays bounded even if the output falls behind.
+    """
+
+    def __init__(self, backend, depth=2):
+        self.backend = backend
+        self.depth = depth
+        # depth queued buffers plus the one the output thread is showing
+        self._free = [np.zeros((backend.count, 3), dtype=np.uint8) for _ in range(depth + 1)]
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closing = False
+        # Exception that stopped the output thread, re-raised to the render side
+        self.error = None
+        self.published = 0
+        self.pushed = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='led-output', daemon=True)
+        self._thread.start()
+
+    def _check(self):
+        if self.error is not None:
+            raise RuntimeError("LED output thread failed") from self.error
+
+    def acquire(self):
+        """Return a back buffer to render the next frame into"""
+        with self._cond:
+            self._check()
+            if self._free:
+                return self._free.pop()
+            # Every buffer is queued or in flight: drop the oldest frame
+            self.dropped += 1
+            return self._queue.popleft()
+
+    def publish(self, buffer):
+        """Queue a filled back buffer for output"""
+        with self._cond:
+            self._check()
+            self._queue.append(buffer)
+            self.published += 1
+            self._cond.notify()
+
+    def submit(self, leds):
+        """Copy an LED frame into a back buffer and queue it"""
+        buffer = self.acquire()
+        np.copyto(buffer, leds)
+        self.publish(buffer)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                front = self._queue.popleft()
+                self._busy = True
+            # The transfer happens outside the lock, so rendering carries on
+            try:
+                self.backend.show(front)
+            except Exception as e:
+                with self._cond:
+                    self.error = e
+                return
+            finally:
+                with self._cond:
+                    self._free.append(front)
+                    self._busy = False
+                    if self.error is None:
+                        self.pushed += 1
+                    self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every queued frame has been pushed"""
+        with self._cond:
+            done = self._cond.wait_for(
+                lambda: self.error is not None or (not self._queue and not self._busy), timeout)
+            self._check()
+            return done
+
+    def close(self):
+        """Push whatever is queued, then stop the thread"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -0,0 +1,99 @@
+"""Keep the panel's estimated current draw under a power supply budget.
+
+A WS2812B draws roughly 20 mA per color channel at full value plus about
+1 mA idle, so a frame's draw follows from the sum of its channel values.
+The limiter sums each transmitted frame in one vectorized reduction and
+scales the frame down through a cached brightness table when the estimate
+exceeds the budget. Cuts take effect on the same frame; recovery is eased
+in over several frames so the panel does not visibly pump.
+"""
+import numpy as np
+from matrix_color import brightness_lut
+
+class PowerLimiter:
+    """Dynamic brightness scaling to a current budget in mA"""
+
+    def __init__(self, budget_ma, count, ma_per_channel=20.0, idle_ma=1.0, brightness=1.0,
+                 release=0.1):
+        self.budget_ma = budget_ma
+        self.count = count
+        self.ma_per_channel = ma_per_channel
+        self.idle_ma = idle_ma
+        # Global brightness applied after us (e.g. the ws281x setting), as 0.0-1.0
+        self.brightness = brightness
+        # Fraction of the way back up to full level recovered per frame
+        self.release = release
+        self.level = 255
+        self.target = 255
+        # Channel sum of the last frame seen, reused while it is unchanged
+        self.total = 0
+        self.estimated_ma = 0.0
+        self.limited_ma = 0.0
+        self.peak_ma = 0.0
+        self.limited_frames = 0
+
+    @property
+    def settled(self):
+        """True once the level has caught up with the current frame's target"""
+        return self.level == self.target
+
+    def update(self, total):
+        """Recompute the estimate and scale level for a frame's channel sum"""
+        self.total = total
+        idle = self.idle_ma * self.count
+        dynamic = total * self.ma_per_channel / 255.0 * self.brightness
+        self.estimated_ma = idle + dynamic
+        self.peak_ma = max(self.peak_ma, self.estimated_ma)
+
+        available = max(self.budget_ma - idle, 0.0)
+        self.target = 255 if dynamic <= available else int(255 * available / dynamic)
+        if self.target < self.level:
+            self.level = self.target
+        elif self.target > self.level:
+            step = max(1, int((self.target - self.level) * self.release))
+            self.level = min(self.target, self.level + step)
+        self.limited_ma = idle + dynamic * self.level / 255.0
+        if self.level < 255:
+            self.limited_frames += 1
+        return self.level
+
+    def limit(self, leds, out=None, total=None):
+        """Scale (N, 3) LED data into out (in place by default) to fit the budget
+
+        Pass total to reuse a known channel sum instead of summing again.
+        """
+        if out is None:
+            out = leds
+        if total is None:
+            # Reduce straight from uint8 without a widened temporary
+            total = int(np.add.reduce(leds, axis=None, dtype=np.uint64))
+        level = self.update(total)
+        if level < 255:
+            np.take(brightness_lut(level), leds, out=out, mode='clip')
+        elif out is not leds:
+            np.copyto(out, leds)
+        return out
+
+    def stats(self):
+        """Current and peak draw estimates"""
+        return {
+            'budget_ma': self.budget_ma,
+            'estimated_ma': round(self.estimated_ma, 1),
+            'limited_ma': round(self.limited_ma, 1),
+            'peak_ma': round(self.peak_ma, 1),
+            'level': self.level,
+            'limited_frames': self.limited_frames,
+        }
+
+def add_power_arguments(parser):
+    """Add the power budget options shared by the matrix scripts"""
+    parser.add_argument('--max-ma', type=float, default=None,
+                        help='Scale frames down to stay under this current draw in mA')
+    parser.add_argument('--ma-per-channel', type=float, default=20.0,
+                        help='Current of one LED color channel at full value, in mA')
+
+def power_from_args(args, count):
+    """Build the PowerLimiter described by add_power_arguments() options, or None"""
+    if args.max_ma is None:
+        return None
+    return PowerLimiter(args.max_ma, count, args.ma_per_channel)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Drive the matrix from pixel data streamed over UDP.
+
+Frames are row-major RGB for the logical canvas (x across, y down); the
+matrix's mapping takes care of the wiring. Supported packet formats:
+
+    ddp    Distributed Display Protocol, port 4048. Data lands at the
+           packet's byte offset; the PUSH flag ends a frame. Only RGB
+           data for the default display (or all devices) is used; query,
+           config and status packets count as bad.
+    e131   E1.31 / sACN, port 5568. 170 pixels per universe, starting at
+           --universe; the last universe (or a repeated one) ends a frame.
+           Sequence numbers are tracked per universe. Sync and discovery
+           packets, and data with a non-zero DMX start code (e.g. 0xDD
+           per-address priority), are ignored.
+    raw    One datagram per frame, port 7777.
+
+Each datagram is received with recv_into() into one preallocated buffer
+and copied into the framebuffer. Lost packets just leave stale pixels,
+and frames are shown as soon as they complete, at the sender's rate.
+"""
+import argparse
+import socket
+import struct
+import sys
+import time
+import uuid
+import numpy as np
+from matrix_backends import NullBackend, require_root
+from matrix_display import NeoMatrix, PATTERNS
+from matrix_engine import Canvas, frames
+from matrix_mapping import add_mapping_arguments, mapping_from_args
+
+DEFAULT_PORTS = {'ddp': 4048, 'e131': 5568, 'raw': 7777}
+
+# DDP: flags, sequence, data type, destination id, byte offset, data length
+DDP_HEADER = struct.Struct('>BBBBIH')
+DDP_VERSION = 0x40
+DDP_TIMECODE = 0x10
+DDP_STORAGE = 0x08
+DDP_REPLY = 0x04
+DDP_QUERY = 0x02
+DDP_PUSH = 0x01
+# Data types carrying pixels: undefined (0) and 8-bit RGB
+DDP_PIXEL_TYPES = (0x00, 0x0b)
+DDP_TYPE_RGB8 = 0x0b
+# Destination ids addressing the display: the default output device and all devices
+DDP_DISPLAY_IDS = (1, 255)
+DDP_MAX_DATA = 1440
+
+# E1.31 field offsets and constants
+E131_ACN_ID = b'ASC-E1.17\x00\x00\x00'
+E131_ROOT_VECTOR = 18
+E131_FRAMING_VECTOR = 40
+E131_DMP_VECTOR = 117
+E131_VECTOR_DATA = 0x04      # root layer: a data packet
+E131_VECTOR_EXTENDED = 0x08  # root layer: sync or universe discovery
+E131_VECTOR_DMX = 0x02       # framing layer: DMX data follows
+E131_VECTOR_SET = 0x02       # DMP layer: set property (the levels)
+E131_SEQUENCE = 111
+E131_UNIVERSE = 113
+E131_COUNT = 123
+E131_START_CODE = 125
+E131_DATA = 126
+E131_SLOTS = 510  # 170 RGB pixels per universe
+
+class FrameReceiver:
+    """Reassembles UDP pixel packets into a NeoMatrix framebuffer"""
+
+    def __init__(self, matrix, protocol='ddp', port=None, host='0.0.0.0', universe=1):
+        if protocol not in DEFAULT_PORTS:
+            raise ValueError(f"unknown protocol {protocol!r}")
+        self.matrix = matrix
+        self.protocol = protocol
+        self.start_universe = universe
+        self.universes = -(-matrix.NUM_PIXELS * 3 // E131_SLOTS)
+
+        # Byte view of the framebuffer that packets are copied into
+        self.frame_bytes = matrix.frame.reshape(-1)
+        self.packet = bytearray(65536)
+        self._packet_view = memoryview(self.packet)
+        self._packet_array = np.frombuffer(self.packet, dtype=np.uint8)
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, DEFAULT_PORTS[protocol] if port is None else port))
+        self.sock.settimeout(0.5)
+        self.address = self.sock.getsockname()
+
+        self.packets = 0
+        self.bad_packets = 0
+        self.lost_packets = 0
+        self.frames = 0
+        # Last sequence number per stream: E1.31 numbers each universe separately
+        self._sequence = {}
+        self._seen = set()
+        self._running = False
+
+    def _copy(self, offset, start, length):
+        """Copy packet bytes [start, start+length) to framebuffer byte offset"""
+        length = min(length, self.frame_bytes.size - offset)
+        if length > 0:
+            self.frame_bytes[offset:offset + length] = self._packet_array[start:start + length]
+
+    def _check_sequence(self, sequence, modulo, stream=0):
+        last = self._sequence.get(stream)
+        if last is not None and sequence != (last + 1) % modulo:
+            self.lost_packets += (sequence - last - 1) % modulo
+        self._sequence[stream] = sequence
+
+    def _push(self):
+        self.matrix.show()
+        self.frames += 1
+
+    def handle_ddp(self, size):
+        if size < DDP_HEADER.size:
+            return False
+        flags, sequence, data_type, destination, offset, length = DDP_HEADER.unpack_from(self.packet)
+        if flags & 0xc0 != DDP_VERSION:
+            return False
+        if (flags & (DDP_QUERY | DDP_REPLY | DDP_STORAGE) or data_type not in DDP_PIXEL_TYPES
+                or destination not in DDP_DISPLAY_IDS):
+            # Config, status and query traffic, or pixels for another output
+            return False
+        start = DDP_HEADER.size + (4 if flags & DDP_TIMECODE else 0)
+        if sequence & 0x0f:
+            # Sequence numbers 1-15 cycle; 0 means unused
+            self._check_sequence((sequence & 0x0f) - 1, 15)
+        self._copy(offset, start, min(length, size - start))
+        if flags & DDP_PUSH:
+            self._push()
+        return True
+
+    def handle_e131(self, size):
+        if size < E131_FRAMING_VECTOR + 4 or self.packet[4:16] != E131_ACN_ID:
+            return False
+        root_vector = struct.unpack_from('>I', self.packet, E131_ROOT_VECTOR)[0]
+        if root_vector == E131_VECTOR_EXTENDED:
+            # Synchronization and discovery carry no levels
+            return True
+        if (root_vector != E131_VECTOR_DATA or size <= E131_DATA
+                or struct.unpack_from('>I', self.packet, E131_FRAMING_VECTOR)[0] != E131_VECTOR_DMX
+                or self.packet[E131_DMP_VECTOR] != E131_VECTOR_SET):
+            return False
+        universe = struct.unpack_from('>H', self.packet, E131_UNIVERSE)[0]
+        index = universe - self.start_universe
+        if not 0 <= index < self.universes:
+            return True
+        # The property count includes the start code
+        slots = min(struct.unpack_from('>H', self.packet, E131_COUNT)[0] - 1, size - E131_DATA)
+        self._check_sequence(self.packet[E131_SEQUENCE], 256, index)
+        if self.packet[E131_START_CODE] != 0:
+            # Not pixel levels (priorities, text, ...)
+            return True
+        if index in self._seen:
+            # A universe came round again before the frame completed: show what we have
+            self._push()
+            self._seen.clear()
+        self._copy(index * E131_SLOTS, E131_DATA, slots)
+        self._seen.add(index)
+        if index == self.universes - 1:
+            self._push()
+            self._seen.clear()
+        return True
+
+    def receive(self):
+        """Handle one datagram; returns False on timeout"""
+        try:
+            if self.protocol == 'raw':
+                # A whole frame per datagram: receive straight into the framebuffer
+                size = self.sock.recv_into(memoryview(self.frame_bytes))
+                self.packets += 1
+                self._push()
+                return True
+            size = self.sock.recv_into(self._packet_view)
+        except socket.timeout:
+            return False
+        self.packets += 1
+        handler = self.handle_ddp if self.protocol == 'ddp' else self.handle_e131
+        if not handler(size):
+            self.bad_packets += 1
+        return True
+
+    def serve_forever(self):
+        """Receive and show frames until stop() is called"""
+        self._running = True
+        while self._running:
+            self.receive()
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        self.sock.close()
+
+class FrameSender:
+    """Streams canvas frames to a FrameReceiver (for remote rendering and tests)"""
+
+    def __init__(self, host, protocol='ddp', port=None, universe=1):
+        self.address = (host, DEFAULT_PORTS[protocol] if port is None else port)
+        self.protocol = protocol
+        self.start_universe = universe
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Next sequence number per stream (E1.31 universe index; DDP uses 0)
+        self._sequence = {}
+        self._cid = uuid.uuid4().bytes
+
+    def _e131_packet(self, universe, sequence, data):
+        slots = len(data)
+        packet = bytearray(E131_DATA + slots)
+        struct.pack_into('>HH12sHI16s', packet, 0, 0x0010, 0, E131_ACN_ID,
+                         0x7000 | (len(packet) - 16), 4, self._cid)
+        struct.pack_into('>HI64sBHBBH', packet, 38, 0x7000 | (len(packet) - 38), 2,
+                         b'wyp-pi', 100, 0, sequence, 0, universe)
+        struct.pack_into('>HBBHHHB', packet, 115, 0x7000 | (len(packet) - 115), 2,
+                         0xa1, 0, 1, slots + 1, 0)
+        packet[E131_DATA:] = data
+        return packet
+
+    def send(self, frame):
+        """Send one (H, W, 3) frame"""
+        data = memoryview(np.ascontiguousarray(frame, dtype=np.uint8).reshape(-1))
+        if self.protocol == 'raw':
+            self.sock.sendto(data, self.address)
+        elif self.protocol == 'ddp':
+            for offset in range(0, len(data), DDP_MAX_DATA):
+                chunk = data[offset:offset + DDP_MAX_DATA]
+                sequence = self._sequence[0] = self._sequence.get(0, 0) % 15 + 1
+                flags = DDP_VERSION | (DDP_PUSH if offset + len(chunk) >= len(data) else 0)
+                header = DDP_HEADER.pack(flags, sequence, DDP_TYPE_RGB8, 1, offset, len(chunk))
+                self.sock.sendto(header + chunk, self.address)
+        else:
+            for index, offset in enumerate(range(0, len(data), E131_SLOTS)):
+                sequence = self._sequence[index] = (self._sequence.get(index, 0) + 1) % 256
+                packet = self._e131_packet(self.start_universe + index, sequence,
+                                           data[offset:offset + E131_SLOTS])
+                self.sock.sendto(packet, self.address)
+
+    def close(self):
+        self.sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream pixel frames to the matrix over UDP')
+    parser.add_argument('mode', choices=['receive', 'send'],
+                        help='receive: drive the matrix; send: stream a pattern to a receiver')
+    parser.add_argument('--protocol', default='ddp', choices=list(DEFAULT_PORTS))
+    parser.add_argument('--port', type=int, default=None, help='UDP port (default per protocol)')
+    parser.add_argument('--host', default=None,
+                        help='Address to listen on (receive) or send to (send)')
+    parser.add_argument('--universe', type=int, default=1, help='First E1.31 universe')
+    parser.add_argument('--pin', type=int, default=18, help='GPIO pin number')
+    parser.add_argument('--brightness', type=int, default=50, help='Brightness (0-255)')
+    parser.add_argument('--backend', default='ws281x', choices=['ws281x', 'null'])
+    parser.add_argument('--pattern', default='rainbow', choices=PATTERNS.names(),
+                        help='Pattern to stream in send mode')
+    parser.add_argument('--fps', type=float, default=None, help='Send rate (default: pattern rate)')
+    add_mapping_arguments(parser)
+    args = parser.parse_args()
+    mapping = mapping_from_args(args)
+
+    if args.mode == 'send':
+        sender = FrameSender(args.host or '127.0.0.1', args.protocol, args.port, args.universe)
+        spec = PATTERNS.get(args.pattern)
+        period = 1.0 / (args.fps or spec.fps)
+        print(f"Streaming {args.pattern} to {sender.address[0]}:{sender.address[1]} ({args.protocol})")
+        try:
+            while True:
+                deadline = time.monotonic()
+                for frame in frames(spec, Canvas(mapping), args.fps):
+                    sender.send(frame)
+                    deadline += period
+                    time.sleep(max(0.0, deadline - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sender.close()
+        return
+
+    if args.backend == 'ws281x':
+        require_root('matrix_receiver.py')
+    backend = NullBackend(mapping.count) if args.backend == 'null' else None
+    matrix = NeoMatrix(pin=args.pin, brightness=args.brightness, mapping=mapping, backend=backend)
+    receiver = FrameReceiver(matrix, args.protocol, args.port, args.host or '0.0.0.0', args.universe)
+    print(f"Listening for {args.protocol} on {receiver.address[0]}:{receiver.address[1]}")
+    print("Press Ctrl+C to exit")
+    try:
+        receiver.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Frames: {receiver.frames}, packets: {receiver.packets}, "
+              f"lost: {receiver.lost_packets}, bad: {receiver.bad_packets}", file=sys.stderr)
+        matrix.clear()
+        matrix.show()
+    finally:
+        receiver.close()
+        matrix.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Shader-style patterns: whole frames computed from coordinate grids and time.
+
+A shader is a function f(grid, t, **params) that returns a whole frame as
+one NumPy expression over a Grid's precomputed coordinate arrays. The
+shader() decorator turns it into a pattern generator that evaluates it
+once per frame at the pattern time the engine sends in. A shader returns
+one of:
+
+- an (H, W) integer array: palette positions, wrapped to 0-255
+- an (H, W) float array: palette positions in turns (1.0 = once around)
+- an (H, W, 3) array: RGB values, clipped to 0-255
+
+Grids are built once per panel geometry. sin() and cos() take angles in
+turns and read a shared 1024-entry table, so their cost doesn't depend on
+how fast the platform's libm is; np.sin works just as well where it is
+vectorized.
+"""
+import functools
+import inspect
+import numpy as np
+from matrix_color import HUES, WHEEL
+
+TABLE_SIZE = 1024
+# One full period of sine over TABLE_SIZE steps
+SINE = np.sin(np.arange(TABLE_SIZE) * (2 * np.pi / TABLE_SIZE)).astype(np.float32)
+
+def sin(turns):
+    """Table sine of an angle in turns (1.0 = 2 pi)"""
+    index = np.multiply(turns, TABLE_SIZE).astype(np.intp)
+    index &= TABLE_SIZE - 1
+    return np.take(SINE, index)
+
+def cos(turns):
+    """Table cosine of an angle in turns"""
+    return sin(np.add(turns, 0.25))
+
+class Grid:
+    """Read-only per-pixel coordinate arrays for one panel geometry.
+
+    x, y are pixel columns and rows; u, v are centred on the panel and
+    scaled so the shorter side spans -1 to 1; radius and angle (in turns,
+    0-1) are polar coordinates of u, v; index is each pixel's LED number.
+    """
+
+    def __init__(self, mapping):
+        self.width = mapping.width
+        self.height = mapping.height
+        y, x = np.mgrid[:self.height, :self.width].astype(np.float32)
+        half = min(self.width, self.height) / 2
+        self.x = x
+        self.y = y
+        self.u = (x - (self.width - 1) / 2) / half
+        self.v = (y - (self.height - 1) / 2) / half
+        self.radius = np.hypot(self.u, self.v)
+        self.angle = (np.arctan2(self.v, self.u) / (2 * np.pi)) % 1.0
+        self.index = mapping.index_map
+        for array in (self.x, self.y, self.u, self.v, self.radius, self.angle):
+            array.flags.writeable = False
+
+@functools.lru_cache(maxsize=8)
+def get_grid(mapping):
+    """The shared Grid for a mapping"""
+    return Grid(mapping)
+
+class _Output:
+    """Turns a shader's result into RGB in a frame, reusing scratch arrays"""
+
+    def __init__(self, width, height, palette):
+        self.palette = palette
+        self._positions = np.empty((height, width), dtype=np.intp)
+        self._scaled = np.empty((height, width), dtype=np.float32)
+
+    def __call__(self, values, frame):
+        values = np.asarray(values)
+        if values.ndim == 3:
+            np.clip(values, 0, 255, out=frame, casting='unsafe')
+            return frame
+        positions = self._positions
+        if values.dtype.kind == 'f':
+            np.multiply(values, 256, out=self._scaled)
+            np.floor(self._scaled, out=self._scaled)
+            np.copyto(positions, self._scaled, casting='unsafe')
+        else:
+            np.copyto(positions, values, casting='unsafe')
+        positions &= 255
+        return np.take(self.palette, positions, axis=0, out=frame, mode='clip')
+
+def shader(palette=HUES, duration=None):
+    """Decorator making f(grid, t, **params) a pattern generator.
+
+    The pattern runs for duration seconds of pattern time (forever if
+    None); palette colors scalar results.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def pattern(canvas, duration=duration, palette=palette, **params):
+            grid = get_grid(canvas.mapping)
+            output = _Output(canvas.WIDTH, canvas.HEIGHT, palette)
+            t = 0.0
+            while duration is None or t < duration:
+                output(func(grid, t, **params), canvas.frame)
+                # The engine sends each step's pattern time
+                t = (yield canvas.frame) or t + 1.0 / 50
+        # Advertise the shader's own keyword parameters so they can be checked up front
+        outer = list(inspect.signature(pattern, follow_wrapped=False).parameters.values())[:-1]
+        inner = [p.replace(kind=inspect.Parameter.KEYWORD_ONLY)
+                 for p in list(inspect.signature(func).parameters.values())[2:]]
+        pattern.__signature__ = inspect.Signature(outer + inner)
+        return pattern
+    return decorator
+
+@shader(palette=WHEEL)
+def rainbow(grid, t, speed=50):
+    """The classic wheel along the LED chain, advancing speed positions per second"""
+    return grid.index + round(t * speed)
+
+@shader(duration=20.0)
+def plasma(grid, t, speed=1.0, scale=0.12):
+    """Overlapping sine waves drifting across the panel"""
+    t = t * speed
+    total = (sin(grid.x * scale + t * 0.3) + sin(grid.y * scale * 1.3 - t * 0.2)
+             + sin((grid.x + grid.y) * scale * 0.7 + t * 0.15) + sin(grid.radius * 1.5 - t * 0.4))
+    # The four waves sum to -4..4: one turn of the palette, slowly rotating
+    return total * 0.25 + t * 0.05
+
+@shader(duration=20.0)
+def waves(grid, t, speed=1.0, rings=2.0):
+    """Rings rippling out from the centre"""
+    return grid.radius * rings - t * speed * 0.5
+
+@shader(duration=20.0)
+def tunnel(grid, t, speed=1.0, twist=0.5):
+    """Flying down a striped tunnel"""
+    depth = 1.0 / (grid.radius + 0.3)
+    return grid.angle + depth * twist + t * speed * 0.25
@@ -0,0 +1,138 @@
+"""Bitmap fonts and cached text rendering for scrolling tickers.
+
+Text is rasterized once into a wide boolean strip (rows x columns); scrolling
+then just blits that strip, clipped, at a new offset each frame.
+"""
+import functools
+import numpy as np
+from matrix_gfx import Sprite, blit
+
+# Classic 5x7 font for ASCII 32-126: five column bytes per glyph, bit 0 at the top
+FONT_5X7_COLUMNS = (
+    "0000000000 00005f0000 0007000700 147f147f14 242a7f2a12 2313086462 3649552250 0005030000 "
+    "001c224100 0041221c00 082a1c2a08 08083e0808 0050300000 0808080808 0060600000 2010080402 "
+    "3e5149453e 00427f4000 4261514946 2141454b31 1814127f10 2745454539 3c4a494930 0171090503 "
+    "3649494936 064949291e 0036360000 0056360000 0814224100 1414141414 0041221408 0201510906 "
+    "324979413e 7e1111117e 7f49494936 3e41414122 7f4141221c 7f49494941 7f09090101 3e41415132 "
+    "7f0808087f 00417f4100 2040413f01 7f08142241 7f40404040 7f0204027f 7f0408107f 3e4141413e "
+    "7f09090906 3e4151215e 7f09192946 4649494931 01017f0101 3f4040403f 1f2040201f 7f2018207f "
+    "6314081463 0304780403 6151494543 00007f4141 0204081020 41417f0000 0402010204 4040404040 "
+    "0001020400 2054545478 7f48444438 3844444420 384444487f 3854545418 087e090102 081454543c "
+    "7f08040478 00447d4000 2040443d00 007f102844 00417f4000 7c04180478 7c08040478 3844444438 "
+    "7c14141408 081414187c 7c08040408 4854545420 043f444020 3c4040207c 1c2040201c 3c4030403c "
+    "4428102844 0c5050503c 4464544c44 0008364100 00007f0000 0041360800 1008081008"
+).split()
+
+class BitmapFont:
+    """A fixed-height bitmap font: each glyph is a (height, width) bool array"""
+
+    def __init__(self, glyphs, height, spacing=1, default='?'):
+        self.glyphs = glyphs
+        self.height = height
+        # Blank columns between glyphs
+        self.spacing = spacing
+        self.default = default
+
+    def glyph(self, char):
+        """The bitmap for char, falling back to the default glyph"""
+        bitmap = self.glyphs.get(char)
+        if bitmap is None:
+            bitmap = self.glyphs.get(self.default, np.zeros((self.height, 1), dtype=bool))
+        return bitmap
+
+    @classmethod
+    def from_columns(cls, columns, first=32, height=7, spacing=1):
+        """Build a font from hex column strings, one per character code"""
+        glyphs = {}
+        for code, hex_columns in enumerate(columns, first):
+            bits = np.frombuffer(bytes.fromhex(hex_columns), dtype=np.uint8)
+            # Unpack each column byte LSB first, so bit 0 becomes the top row
+            glyphs[chr(code)] = np.unpackbits(bits[None, :], axis=0, bitorder='little')[:height].astype(bool)
+        return cls(glyphs, height, spacing)
+
+    @classmethod
+    def load_bdf(cls, path, spacing=0):
+        """Load a BDF font file, laying every glyph out on the font's baseline"""
+        with open(path) as f:
+            lines = [line.split() for line in f.read().splitlines()]
+
+        properties = {}
+        chars = []
+        current = None
+        for fields in lines:
+            if not fields:
+                continue
+            key = fields[0]
+            if current is None:
+                if key == 'STARTCHAR':
+                    current = {'rows': None}
+                else:
+                    properties[key] = fields[1:]
+            elif key == 'ENDCHAR':
+                chars.append(current)
+                current = None
+            elif current['rows'] is not None:
+                current['rows'].append(fields[0])
+            elif key == 'BITMAP':
+                current['rows'] = []
+            else:
+                current[key] = [int(v) for v in fields[1:]]
+
+        if 'FONTBOUNDINGBOX' not in properties:
+            raise ValueError(f"{path}: not a BDF font (no FONTBOUNDINGBOX)")
+        bbox_h, bbox_y = int(properties['FONTBOUNDINGBOX'][1]), int(properties['FONTBOUNDINGBOX'][3])
+        ascent = int(properties.get('FONT_ASCENT', [bbox_h + bbox_y])[0])
+        descent = int(properties.get('FONT_DESCENT', [-bbox_y])[0])
+
+        glyphs = {}
+        for char in chars:
+            if 'ENCODING' not in char or char['ENCODING'][0] < 0 or 'BBX' not in char:
+                continue
+            width, height, x_off, y_off = char['BBX']
+            advance = char.get('DWIDTH', [width])[0]
+            cell = np.zeros((ascent + descent, max(advance, x_off + width, 1)), dtype=bool)
+            top = ascent - (height + y_off)
+            for r, row in enumerate(char['rows'][:height]):
+                # Each row is hex, padded on the right to a whole number of bytes
+                bits = np.unpackbits(np.frombuffer(bytes.fromhex(row), dtype=np.uint8))[:width]
+                if 0 <= top + r < cell.shape[0]:
+                    cell[top + r, max(x_off, 0):max(x_off, 0) + width] = bits[:cell.shape[1] - max(x_off, 0)]
+            glyphs[chr(char['ENCODING'][0])] = cell
+        return cls(glyphs, ascent + descent, spacing)
+
+FONT_5X7 = BitmapFont.from_columns(FONT_5X7_COLUMNS)
+
+@functools.lru_cache(maxsize=None)
+def load_font(path):
+    """Load a BDF font once per path"""
+    return BitmapFont.load_bdf(path)
+
+@functools.lru_cache(maxsize=64)
+def render_text(text, font=FONT_5X7):
+    """Rasterize a string into a (font.height, width) bool strip (LRU cached)"""
+    if not text:
+        return np.zeros((font.height, 0), dtype=bool)
+    gap = np.zeros((font.height, font.spacing), dtype=bool)
+    pieces = []
+    for char in text:
+        pieces.append(font.glyph(char))
+        pieces.append(gap)
+    strip = np.concatenate(pieces[:-1], axis=1)
+    strip.flags.writeable = False
+    return strip
+
+def scroll_text(canvas, text, color=(255, 255, 255), font=FONT_5X7, y=None, loops=1):
+    """Generator scrolling text right to left across a canvas, one column per frame.
+
+    The string is rendered once into a sprite; each frame is one clipped blit.
+    """
+    sprite = Sprite.from_mask(render_text(text, font), color)
+    if y is None:
+        y = max((canvas.HEIGHT - font.height) // 2, 0)
+
+    for _ in range(loops):
+        # Start just off the right edge and finish once the text has left on the left
+        for x in range(canvas.WIDTH, -sprite.width - 1, -1):
+            canvas.clear()
+            blit(canvas.frame, sprite, x, y)
+            yield canvas.frame
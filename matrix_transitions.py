@@ -0,0 +1,186 @@
+"""Transitions between patterns and a playlist that chains them seamlessly.
+
+A transition blends an outgoing frame a into an incoming frame b at a
+given progress (0.0-1.0), writing into out in one vectorized pass. Each
+transition allocates its scratch arrays once for the canvas size, so
+blending adds no per-frame allocations.
+"""
+import sys
+import numpy as np
+from matrix_engine import Canvas, frames
+
+class Crossfade:
+    """Linear fade from a to b"""
+
+    def __init__(self, width, height):
+        self._mix = np.empty((height, width, 3), dtype=np.int32)
+        self._base = np.empty((height, width, 3), dtype=np.int32)
+
+    def __call__(self, a, b, progress, out):
+        # out = a + (b - a) * progress, in 8-bit fixed point. Widening with
+        # copyto first keeps the arithmetic single-typed, so NumPy needs no
+        # casting buffers.
+        mix, base = self._mix, self._base
+        np.copyto(mix, b)
+        np.copyto(base, a)
+        mix -= base
+        mix *= int(progress * 256)
+        mix >>= 8
+        mix += base
+        np.copyto(out, mix, casting='unsafe')
+        return out
+
+class MaskTransition:
+    """b replaces a wherever a pixel's threshold is below the progress"""
+
+    def __init__(self, width, height):
+        self._threshold = self.thresholds(width, height).astype(np.float32)
+        self._mask = np.empty((height, width, 1), dtype=bool)
+
+    def thresholds(self, width, height):
+        """(height, width) values in [0, 1): when each pixel switches over"""
+        raise NotImplementedError
+
+    def __call__(self, a, b, progress, out):
+        np.less(self._threshold, np.float32(progress), out=self._mask[:, :, 0])
+        np.copyto(out, a)
+        np.copyto(out, b, where=self._mask)
+        return out
+
+class Wipe(MaskTransition):
+    """b sweeps in from the left edge"""
+
+    def thresholds(self, width, height):
+        return np.broadcast_to(np.arange(width) / width, (height, width))
+
+class Dissolve(MaskTransition):
+    """b appears a few random pixels at a time"""
+
+    def thresholds(self, width, height, seed=0):
+        order = np.random.default_rng(seed).permutation(width * height)
+        return (order / (width * height)).reshape(height, width)
+
+TRANSITIONS = {
+    'crossfade': Crossfade,
+    'wipe': Wipe,
+    'dissolve': Dissolve,
+}
+
+class PatternSource:
+    """A pattern advanced at its own frame rate against playlist time.
+
+    spec None is a black source that never ends. A pattern that raises is
+    reported and counts as finished, so a playlist moves on past it.
+    """
+
+    def __init__(self, spec, mapping, start, params=None, repeat=False):
+        self.spec = spec
+        self.mapping = mapping
+        self.params = params or {}
+        self.start = start
+        # Playlist time the current pass of the pattern began at
+        self._origin = start
+        self.repeat = repeat
+        self.finished = False
+        self.frame = np.zeros((mapping.height, mapping.width, 3), dtype=np.uint8)
+        if spec is not None:
+            self._restart()
+
+    def _restart(self):
+        self._frames = frames(self.spec, Canvas(self.mapping), **self.params)
+        self._steps = 0
+        self._step()
+
+    def _step(self):
+        try:
+            frame = next(self._frames, None)
+        except Exception as e:
+            print(f"Pattern {self.spec.name} failed: {e!r}", file=sys.stderr)
+            self.finished = True
+            return
+        if frame is None:
+            if self.repeat and self._steps:
+                # Count the next pass from where this one ended
+                self._origin += self._steps / self.spec.fps
+                self._restart()
+                return
+            # Hold the last frame
+            self.finished = True
+            return
+        self.frame = frame
+        self._steps += 1
+
+    def advance(self, t):
+        """The pattern's frame at playlist time t"""
+        if self.spec is None:
+            return self.frame
+        # A restart moves start on, so the due step is recomputed each time
+        while not self.finished and self._steps <= (t - self._origin) * self.spec.fps:
+            self._step()
+        return self.frame
+
+def sequence(canvas, next_item, transition='crossfade', fade=1.0):
+    """Generator playing patterns handed out by next_item(), blending between them.
+
+    next_item(t) returns (spec, params, seconds), or None to fade to black
+    and stop. Each pattern plays to its end, or for seconds (repeating if
+    it ends early), then fades into the next over fade seconds while both
+    run. Patterns keep their own frame rates; time comes from the values
+    frames() sends in.
+    """
+    blend = TRANSITIONS[transition](canvas.WIDTH, canvas.HEIGHT)
+    blank = np.zeros_like(canvas.frame)
+
+    def start(t):
+        item = next_item(t)
+        if item is None:
+            return None, None
+        spec, params, seconds = item
+        return PatternSource(spec, canvas.mapping, t, params, repeat=seconds is not None), seconds
+
+    t = 0.0
+    current, seconds = start(t)
+    if current is None:
+        return
+    incoming = None
+    fade_start = None
+    while True:
+        frame = current.advance(t)
+        if fade_start is None and (current.finished or
+                                   (seconds is not None and t - current.start >= seconds - fade)):
+            fade_start = t
+            incoming, incoming_seconds = start(t)
+
+        if fade_start is not None:
+            progress = min((t - fade_start) / fade, 1.0) if fade > 0 else 1.0
+            target = incoming.advance(t) if incoming else blank
+            frame = blend(frame, target, progress, canvas.frame)
+            if progress >= 1.0:
+                if incoming is None:
+                    yield frame
+                    return
+                current, seconds = incoming, incoming_seconds
+                incoming, fade_start = None, None
+        # Outside transitions the source's own frame is passed through uncopied
+        t = (yield frame) or t + 1.0 / 50
+
+def playlist(canvas, registry, names, params=None, seconds=None, transition='crossfade',
+             fade=1.0, loop=True, announce=None):
+    """Generator playing registered patterns back to back, blending between them.
+
+    The last one fades to black unless loop is set; see sequence().
+    """
+    params = params or {}
+    count = 0
+
+    def next_item(t):
+        nonlocal count
+        if not names or (count >= len(names) and not loop):
+            return None
+        name = names[count % len(names)]
+        count += 1
+        if announce:
+            announce(name)
+        return registry.get(name), params.get(name, {}), seconds
+
+    yield from sequence(canvas, next_item, transition, fade)
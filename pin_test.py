@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import os
 import sys
 import time
 from rpi_ws281x import PixelStrip, Color
@@ -83,7 +84,8 @@ def main():
             print("\nTest interrupted by user")
 
 if __name__ == "__main__":
-    if not sys.argv[0].startswith('sudo'):
+    # rpi_ws281x needs root for /dev/mem; argv[0] never contains "sudo"
+    if os.geteuid() != 0:
         print("This script must be run with sudo privileges.")
         print("Usage: sudo python3 pin_test.py [GPIO_PIN_NUMBER]")
         sys.exit(1)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import time
 from rpi_ws281x import PixelStrip, Color
+from matrix_color import WHEEL
 
 # LED strip configuration:
 LED_COUNT = 256        # 16x16 = 256 LEDs
@@ -33,14 +34,7 @@ def rainbow(strip, wait_ms=20, iterations=1):
 
 def wheel(pos):
     """Generate rainbow colors across 0-255 positions."""
-    if pos < 85:
-        return Color(pos * 3, 255 - pos * 3, 0)
-    elif pos < 170:
-        pos -= 85
-        return Color(255 - pos * 3, 0, pos * 3)
-    else:
-        pos -= 170
-        return Color(0, pos * 3, 255 - pos * 3)
+    return Color(*WHEEL[pos].tolist())
 
 # Main function
 def main():